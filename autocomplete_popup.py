@@ -0,0 +1,126 @@
+from tkinter import *
+
+# Rows the popup shows at once; longer lists scroll through them
+VISIBLE_ROWS = 8
+
+# Width (pixels) the details of the selected suggestion wrap at
+DETAIL_WRAP = 420
+
+
+class AutocompletePopup:
+    # One popup for the life of the editor, withdrawn instead of destroyed.
+    # The listbox only ever holds VISIBLE_ROWS rows showing the suggestions
+    # from `top` on, and a row is only rewritten when its text changes.
+    # `describe` gives the details shown under the selected suggestion.
+    def __init__(self, parent, style_manager, on_choose, describe=None):
+        self.on_choose = on_choose
+        self.describe = describe
+        self.detail = ""
+        self.suggestions = []
+        self.top = 0
+        self.selected = 0
+        self.rows = []
+        self.position = None
+        self.visible = False
+
+        self.popup = Toplevel(parent)
+        self.popup.wm_overrideredirect(True)
+        self.popup.withdraw()
+
+        self.listbox = Listbox(
+            self.popup,
+            height=1,
+            selectmode=SINGLE,
+            exportselection=False,
+            activestyle="none",
+        )
+        self.listbox.pack(fill="x")
+        self.detail_label = Label(
+            self.popup, justify="left", anchor="w", wraplength=DETAIL_WRAP
+        )
+
+        self.listbox.bind("<Button-1>", self.click)
+        self.listbox.bind("<Double-Button-1>", self.choose)
+        self.listbox.bind("<Return>", self.choose)
+        self.listbox.bind("<MouseWheel>", self.scroll)
+        self.listbox.bind("<Button-4>", lambda event: self.move(-1))
+        self.listbox.bind("<Button-5>", lambda event: self.move(1))
+
+        style_manager.apply_to(self.popup)
+        style_manager.apply_to(self.listbox)
+        style_manager.apply_to(self.detail_label)
+
+    def show(self, suggestions: list, x: int, y: int):
+        self.suggestions = suggestions
+        self.top = 0
+        self.selected = 0
+        self.render()
+
+        if (x, y) != self.position:
+            self.position = (x, y)
+            self.popup.geometry(f"+{x}+{y}")
+        if not self.visible:
+            self.visible = True
+            self.popup.deiconify()
+            self.popup.lift()
+
+    def hide(self, event=None):
+        if self.visible:
+            self.visible = False
+            self.popup.withdraw()
+
+    def selection(self):
+        if not self.visible or not self.suggestions:
+            return None
+        return self.suggestions[self.selected]
+
+    def move(self, step: int):
+        if not self.suggestions:
+            return "break"
+        self.selected = max(0, min(self.selected + step, len(self.suggestions) - 1))
+        if self.selected < self.top:
+            self.top = self.selected
+        elif self.selected >= self.top + VISIBLE_ROWS:
+            self.top = self.selected - VISIBLE_ROWS + 1
+        self.render()
+        return "break"
+
+    def render(self):
+        rows = self.suggestions[self.top : self.top + VISIBLE_ROWS]
+        if len(rows) != len(self.rows):
+            self.listbox.configure(height=len(rows))
+        for index, text in enumerate(rows):
+            if index >= len(self.rows):
+                self.listbox.insert("end", text)
+            elif self.rows[index] != text:
+                self.listbox.delete(index)
+                self.listbox.insert(index, text)
+        if len(self.rows) > len(rows):
+            self.listbox.delete(len(rows), "end")
+        self.rows = rows
+
+        self.listbox.selection_clear(0, "end")
+        self.listbox.selection_set(self.selected - self.top)
+
+        detail = ""
+        if self.describe is not None:
+            detail = self.describe(self.suggestions[self.selected])
+        if detail != self.detail:
+            if not detail:
+                self.detail_label.pack_forget()
+            elif not self.detail:
+                self.detail_label.pack(fill="x")
+            self.detail_label.configure(text=detail)
+            self.detail = detail
+
+    def click(self, event):
+        self.selected = self.top + self.listbox.nearest(event.y)
+        self.render()
+        return "break"
+
+    def scroll(self, event):
+        return self.move(-1 if event.delta > 0 else 1)
+
+    def choose(self, event=None):
+        self.on_choose()
+        return "break"
@@ -0,0 +1,108 @@
+# Run from the repository root: python -m benchmarks.highlight
+import argparse
+import random
+import statistics
+import time
+
+from highlight_engine import HighlightEngine
+
+SIZES = [1_000, 10_000, 100_000]
+
+CLASS_TEMPLATE = '''class Enemy{n}(pydot.sprite.Sprite):
+    """Enemy number {n}, walks towards the player."""
+
+    def __init__(self, pos: tuple, speed: float = {speed}):
+        super().__init__()
+        self.image = pydot.Surface((32, 32))
+        self.image.fill((255, {n} % 255, 0))
+        self.rect = self.image.get_rect(center=pos)
+        self.speed = speed  # pixels per frame
+        self.name = 'enemy_{n}'
+
+    def update(self, target):
+        dx = target.rect.x - self.rect.x
+        dy = target.rect.y - self.rect.y
+        if abs(dx) > abs(dy):
+            self.rect.x += self.speed if dx > 0 else -self.speed
+        else:
+            self.rect.y += self.speed if dy > 0 else -self.speed
+        return self.rect.colliderect(target.rect)
+
+
+'''
+
+
+def make_source(lines: int) -> str:
+    header = "import pygame as pydot\nimport json\n\n\n"
+    chunks = [header]
+    count = header.count("\n")
+    n = 0
+    while count < lines:
+        chunk = CLASS_TEMPLATE.format(n=n, speed=1.5 + n % 7)
+        chunks.append(chunk)
+        count += chunk.count("\n")
+        n += 1
+    return "".join(chunks)
+
+
+def bench_full(text: str) -> float:
+    engine = HighlightEngine("python")
+    start = time.perf_counter()
+    engine.update(text)
+    return time.perf_counter() - start
+
+
+def bench_viewport(text: str, limit: int) -> float:
+    engine = HighlightEngine("python")
+    start = time.perf_counter()
+    engine.update(text, limit)
+    return time.perf_counter() - start
+
+
+def bench_edits(text: str, edits: int) -> list:
+    engine = HighlightEngine("python")
+    engine.update(text)
+
+    rng = random.Random(0)
+    times = []
+    for _ in range(edits):
+        pos = rng.randrange(len(text))
+        if rng.random() < 0.5:
+            text = text[:pos] + "x" + text[pos:]
+        else:
+            text = text[:pos] + text[pos + 1 :]
+        start = time.perf_counter()
+        engine.update(text)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Syntax highlighting benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--viewport", type=int, default=150)
+    args = parser.parse_args()
+
+    print(
+        f"{'lines':>8} {'full (s)':>10} {'lines/s':>10} "
+        f"{'viewport (ms)':>14} {'edit p50 (ms)':>14} {'edit p95 (ms)':>14}"
+    )
+    for size in args.sizes:
+        text = make_source(size)
+        lines = text.count("\n") + 1
+
+        full = bench_full(text)
+        viewport = bench_viewport(text, args.viewport)
+        edits = sorted(bench_edits(text, args.edits))
+        p50 = statistics.median(edits)
+        p95 = edits[int(len(edits) * 0.95) - 1]
+
+        print(
+            f"{lines:>8} {full:>10.3f} {lines / full:>10.0f} "
+            f"{viewport * 1000:>14.2f} {p50 * 1000:>14.2f} {p95 * 1000:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
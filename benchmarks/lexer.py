@@ -0,0 +1,60 @@
+# Run from the repository root: python -m benchmarks.lexer
+import argparse
+import glob
+import os
+import time
+
+from highlight_engine import HighlightEngine
+
+TEMPLATES = ["scripts/*.py", "scripts/built_in/*.py"]
+
+
+def bench_lex(text: str, fast: bool, repeat: int) -> tuple:
+    best = None
+    for _ in range(repeat):
+        engine = HighlightEngine("python", fast=fast)
+        start = time.perf_counter()
+        engine.update(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, engine.spans()
+
+
+def char_tags(spans: list, length: int) -> list:
+    # Per character tag, as token boundaries between equal types may differ
+    tags = [None] * length
+    for start, end, tag in spans:
+        tags[start:end] = [tag] * (end - start)
+    return tags
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Built-in Python lexer against pygments on the project templates"
+    )
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    sources = []
+    for pattern in TEMPLATES:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, encoding="utf-8") as f:
+                sources.append((os.path.normpath(path), f.read()))
+    sources.append(("(all concatenated) x20", "\n".join(s for _, s in sources) * 20))
+
+    print(
+        f"{'file':<42} {'lines':>6} {'pygments (ms)':>14} "
+        f"{'built-in (ms)':>14} {'speedup':>8} {'same':>5}"
+    )
+    for name, text in sources:
+        slow, slow_spans = bench_lex(text, False, args.repeat)
+        fast, fast_spans = bench_lex(text, True, args.repeat)
+        same = char_tags(slow_spans, len(text)) == char_tags(fast_spans, len(text))
+        print(
+            f"{name:<42} {text.count(chr(10)) + 1:>6} {slow * 1000:>14.2f} "
+            f"{fast * 1000:>14.2f} {slow / fast:>7.1f}x {'yes' if same else 'NO':>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Run from the repository root: python -m benchmarks.quick_open
+import argparse
+import os
+import tempfile
+import time
+
+from file_index import FileIndex
+
+QUERIES = ["main", "enemy", "plr", "scr/lvl3", "e", "zzz"]
+
+
+def make_project(root: str, files: int, code_share: float):
+    # Mostly assets, like a real game, with scripts spread over folders
+    code = int(files * code_share)
+    for i in range(files - code):
+        directory = os.path.join(root, "assets", "sprites", f"set{i // 500}")
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, f"frame_{i % 500}.png"), "w").close()
+    for i in range(code):
+        directory = os.path.join(root, "scripts", f"level{i // 100}")
+        os.makedirs(directory, exist_ok=True)
+        name = ["enemy", "player", "tile"][i % 3]
+        open(os.path.join(directory, f"{name}_{i % 100}.py"), "w").close()
+    open(os.path.join(root, "main.py"), "w").close()
+
+
+def timed(function, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Quick-open file index on a synthetic project"
+    )
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument(
+        "--code-share", type=float, default=1.0, help="share of .py files"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        make_project(root, args.files, args.code_share)
+        index = FileIndex(root)
+        start = time.perf_counter()
+        index.refresh()
+        print(f"first scan: {(time.perf_counter() - start) * 1000:.1f} ms")
+        print(f"indexed files: {len(index.files())}")
+        print(f"unchanged poll: {timed(index.refresh, args.repeat) * 1000:.2f} ms")
+        for query in QUERIES:
+            elapsed = timed(lambda: index.search(query), args.repeat)
+            print(f"search {query!r:<12} {elapsed * 1000:>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import json
+import os
+import pickle
+import subprocess
+import sys
+import threading
+from keyword import kwlist
+
+import pygame_api
+from completion_index import FuzzyIndex, candidate
+
+DATA_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "autocomplete_data.json"
+)
+# Compiled index next to the JSON, rebuilt when the JSON changes
+CACHE_FILE = os.path.splitext(DATA_FILE)[0] + ".pickle"
+
+# Bump when the compiled index changes shape
+CACHE_VERSION = 1
+
+WORD_LISTS = [
+    "python_keywords",
+    "python_builtins",
+    "pydot_functions",
+    "pydot_constants",
+    "pydot_modules",
+    "common_patterns",
+]
+
+# Used when the data file is missing or broken
+FALLBACK_DATA = {
+    "python_keywords": kwlist,
+    "python_builtins": [
+        "print",
+        "input",
+        "len",
+        "range",
+        "int",
+        "str",
+        "float",
+        "bool",
+        "list",
+        "dict",
+        "tuple",
+        "set",
+    ],
+    "pydot_functions": [
+        "pygame.init",
+        "pygame.quit",
+        "pygame.display.set_mode",
+        "pygame.event.get",
+    ],
+}
+
+
+class CompletionData:
+    # The static completion vocabulary, the introspected pygame API and a
+    # FuzzyIndex over both
+    def __init__(self, data: dict, candidates: list, api=None):
+        self.python_keywords = data.get("python_keywords", kwlist)
+        self.python_builtins = data.get("python_builtins", [])
+        self.pydot_functions = data.get("pydot_functions", [])
+        self.pydot_constants = data.get("pydot_constants", [])
+        self.pydot_modules = data.get("pydot_modules", [])
+        self.common_patterns = data.get("common_patterns", [])
+        self.code_snippets = data.get("code_snippets", {})
+        self.api = {}
+        if api is not None:
+            self.api, api_candidates = api
+            words = {item[3] for item in candidates}
+            candidates = candidates + [
+                item for item in api_candidates if item[3] not in words
+            ]
+        self.index = FuzzyIndex(candidates=candidates)
+
+    def describe(self, word: str) -> str:
+        # Signature and first docstring line of a pygame suggestion
+        symbol = self.api.get(word)
+        if symbol is None:
+            return ""
+        _, signature, summary = symbol
+        if summary and summary not in signature:
+            return f"{signature}\n{summary}"
+        return signature
+
+
+def compile_candidates(data: dict) -> list:
+    entries = {(word, word) for name in WORD_LISTS for word in data.get(name, [])}
+    entries.update((name, f"snippet:{name}") for name in data.get("code_snippets", {}))
+    return [candidate(key, word) for key, word in entries]
+
+
+def read_data(stat) -> tuple:
+    # (data, candidates) from the compiled cache if it was built from this
+    # version of the JSON, otherwise parsed and compiled again
+    key = (CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+    try:
+        with open(CACHE_FILE, "rb") as f:
+            cached = pickle.load(f)
+        if cached[0] == key:
+            return cached[1], cached[2]
+    except (OSError, pickle.PickleError, EOFError, ValueError, TypeError, IndexError):
+        pass
+
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    candidates = compile_candidates(data)
+    try:
+        with open(CACHE_FILE + ".tmp", "wb") as f:
+            pickle.dump((key, data, candidates), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(CACHE_FILE + ".tmp", CACHE_FILE)
+    except OSError as e:
+        print(f"Error saving completion cache: {e}")
+    return data, candidates
+
+
+def generate_api():
+    # Introspecting pygame takes a while, so the cache is built by a separate
+    # process and picked up the next time the editor starts. It is started
+    # once per pygame version; if it failed, the error it recorded is
+    # reported once.
+    attempt = pygame_api.load_attempt()
+    if attempt is not None and attempt.get("key") == pygame_api.attempt_key():
+        if attempt.get("error") and not attempt.get("reported"):
+            print(
+                "Error generating pygame completions, run pygame_api.py to "
+                f"retry (full output in {pygame_api.LOG_FILE}): {attempt['error']}"
+            )
+            try:
+                pygame_api.save_attempt(attempt["error"], reported=True)
+            except OSError as e:
+                print(f"Error saving pygame completion state: {e}")
+        return
+    try:
+        pygame_api.save_attempt()
+        with open(pygame_api.LOG_FILE, "w") as log:
+            subprocess.Popen(
+                [sys.executable, pygame_api.__file__],
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+    except OSError as e:
+        print(f"Error generating pygame completions: {e}")
+
+
+loaded = None
+lock = threading.Lock()
+
+
+def load() -> CompletionData:
+    # Loaded on first use and shared by every editor in the process
+    global loaded
+    with lock:
+        if loaded is None:
+            try:
+                data, candidates = read_data(os.stat(DATA_FILE))
+            except (OSError, ValueError) as e:
+                print(f"Error loading completion data: {e}")
+                data = FALLBACK_DATA
+                candidates = compile_candidates(data)
+            api = pygame_api.load_api()
+            if api is None and pygame_api.installed_version() is not None:
+                generate_api()
+            loaded = CompletionData(data, candidates, api)
+        return loaded
@@ -0,0 +1,217 @@
+import heapq
+import re
+from bisect import bisect_left
+import threading
+from functools import lru_cache
+
+# Longest suggestion list handed to the popup
+MAX_SUGGESTIONS = 50
+
+# Names a buffer line defines
+DEFINITION_PATTERNS = [re.compile(r"class\s+(\w+)"), re.compile(r"def\s+(\w+)")]
+ASSIGNMENT_PATTERN = re.compile(r"(\w+)\s*=")
+
+
+def completion_key(word: str) -> tuple:
+    return word.casefold(), word
+
+
+def word_starts(key: str) -> frozenset:
+    # Positions where a part of the name starts: the beginning, after
+    # punctuation like "." and "_", and camelCase humps
+    starts = {0}
+    for index in range(1, len(key)):
+        before, char = key[index - 1], key[index]
+        if not before.isalnum() or (char.isupper() and before.islower()):
+            starts.add(index)
+    return frozenset(starts)
+
+
+@lru_cache(maxsize=4096)
+def candidate(key: str, word: str) -> tuple:
+    # (casefolded key, its word start positions, initials, suggestion),
+    # computed once per suggestion
+    folded = key.casefold()
+    starts = word_starts(key)
+    initials = "".join(folded[index] for index in sorted(starts) if index < len(key))
+    return folded, starts, initials, word
+
+
+def fuzzy_score(query: str, folded: str, starts: frozenset):
+    # Best alignment of `query` as a subsequence of `folded`. Characters
+    # matched at word starts or right after the previous match count most,
+    # so "dsm" scores high for "display.set_mode". None if it does not match.
+    scores = None
+    for index, char in enumerate(query):
+        current = []
+        position = folded.find(char)
+        while position != -1:
+            bonus = 8 if position in starts else 1
+            if scores is None:
+                best = bonus
+            else:
+                best = None
+                for previous, score in scores:
+                    if previous >= position:
+                        break
+                    if previous == position - 1:
+                        value = score + bonus + 5
+                    else:
+                        value = score + bonus - min(position - previous - 1, 5) * 0.2
+                    if best is None or value > best:
+                        best = value
+            if best is not None:
+                current.append((position, best))
+            position = folded.find(char, position + 1)
+        if not current:
+            return None
+        scores = current
+    if not scores:
+        return None
+    return max(score for _, score in scores)
+
+
+def rank(query: str, candidates, limit: int = MAX_SUGGESTIONS) -> list:
+    # (score, suggestion) for the best `limit` candidates, best first. A
+    # cheap tier (prefix, initials, any subsequence) picks them with a
+    # heap, only those get the full fuzzy score within their tier.
+    folded_query = query.casefold()
+    if not folded_query:
+        return []
+    # Each character matched at its first occurrence after the previous one,
+    # anchored at the start, so a miss costs one pass over the name
+    pattern = re.compile(
+        "".join(f"[^{re.escape(char)}]*{re.escape(char)}" for char in folded_query)
+    )
+    search = pattern.match
+
+    tiers = []
+    for item in candidates:
+        folded, _, initials, word = item
+        if folded.startswith(folded_query):
+            tier = 2
+        elif search(initials):
+            tier = 1
+        elif search(folded):
+            tier = 0
+        else:
+            continue
+        tiers.append((tier, -len(folded), item))
+    best = heapq.nlargest(limit, tiers, key=lambda entry: entry[:2])
+
+    ranked = []
+    for tier, _, (folded, starts, _, word) in best:
+        # Prefix matches just go shortest first
+        score = 0
+        if tier < 2:
+            score = fuzzy_score(folded_query, folded, starts)
+            if score is None:
+                continue
+        ranked.append((tier * 1000 + score - len(folded) * 0.01, word))
+    ranked.sort(key=lambda entry: (-entry[0], completion_key(entry[1])))
+    return ranked
+
+
+def merge_rankings(*rankings, limit: int = MAX_SUGGESTIONS) -> list:
+    # Suggestions from several rank() results, best first, without duplicates
+    suggestions = []
+    seen = set()
+    for _, word in heapq.merge(
+        *rankings, key=lambda entry: (-entry[0], completion_key(entry[1]))
+    ):
+        if word not in seen:
+            seen.add(word)
+            suggestions.append(word)
+            if len(suggestions) == limit:
+                break
+    return suggestions
+
+
+class FuzzyIndex:
+    # Completion candidates with their matching metadata precomputed, from
+    # (key, suggestion) entries or candidate() tuples built ahead of time.
+    # Sorted by casefolded key, so the prefix matches of a query are one
+    # slice found by bisection.
+    def __init__(self, entries=(), limit: int = MAX_SUGGESTIONS, candidates=None):
+        if candidates is None:
+            candidates = [candidate(key, word) for key, word in set(entries)]
+        self.candidates = sorted(candidates, key=lambda item: (item[0], item[3]))
+        self.keys = [item[0] for item in self.candidates]
+        self.limit = limit
+
+    def search(self, query: str) -> list:
+        folded = query.casefold()
+        if not folded:
+            return []
+        start = bisect_left(self.keys, folded)
+        end = bisect_left(self.keys, folded + "\U0010ffff", start)
+        ranked = rank(query, self.candidates[start:end], self.limit)
+        # Prefix matches rank above everything else, the rest is only
+        # matched when they do not fill the list
+        if len(ranked) < self.limit:
+            rest = self.candidates[:start] + self.candidates[end:]
+            ranked += rank(query, rest, self.limit - len(ranked))
+        return ranked
+
+
+class BufferSymbols:
+    # Names defined on each line of a buffer, reference counted so an edit
+    # only rescans the lines it replaced. Updated by the highlighter's worker
+    # thread and searched from the main thread. Paused for good once the
+    # buffer has a scope tree, which answers instead.
+    def __init__(self, exclude=()):
+        # Assignments to these (keywords) are not names
+        self.exclude = set(exclude)
+        self.lines = [()]
+        self.counts = {}
+        self.paused = False
+        self.lock = threading.Lock()
+
+    def scan_line(self, line: str) -> tuple:
+        names = []
+        for pattern in DEFINITION_PATTERNS:
+            names.extend(pattern.findall(line))
+        for name in ASSIGNMENT_PATTERN.findall(line):
+            if name not in self.exclude:
+                names.append(name)
+        return tuple(names)
+
+    def reset(self, text: str):
+        self.update(text, 0, len(self.lines), text.count("\n") + 1, 0)
+
+    def update(self, text: str, first: int, old_end: int, new_end: int, offset: int):
+        # Lines first..old_end were replaced by first..new_end of `text`,
+        # the first of which starts at `offset`
+        if self.paused:
+            return
+        new_lines = []
+        for _ in range(new_end - first):
+            end = text.find("\n", offset)
+            if end == -1:
+                end = len(text)
+            new_lines.append(self.scan_line(text[offset:end]))
+            offset = end + 1
+
+        with self.lock:
+            if self.paused:
+                return
+            counts = self.counts
+            for names in self.lines[first:old_end]:
+                for name in names:
+                    counts[name] -= 1
+                    if not counts[name]:
+                        del counts[name]
+            for names in new_lines:
+                for name in names:
+                    counts[name] = counts.get(name, 0) + 1
+            self.lines[first:old_end] = new_lines
+
+    def names(self) -> list:
+        with self.lock:
+            return list(self.counts)
+
+    def pause(self):
+        with self.lock:
+            self.paused = True
+            self.lines = [()]
+            self.counts = {}
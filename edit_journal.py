@@ -0,0 +1,208 @@
+import hashlib
+import os
+import queue
+import struct
+import threading
+import zlib
+
+from editor_buffer import content_hash
+from highlight_engine import common_prefix_length, common_suffix_length
+
+# Configuration paths
+if os.name == "nt":  # Windows
+    CONFIG_DIR = os.path.join(os.path.expanduser("~"), "pydot")
+else:  # Linux, macOS, etc.
+    CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".config", "pydot")
+
+JOURNAL_DIR = os.path.join(CONFIG_DIR, "journal")
+
+MAGIC = b"PYDJ"
+JOURNAL_VERSION = 1
+# Journal header: version, length of the buffer's path (which follows)
+HEADER = struct.Struct("<BH")
+# Record header: kind, start, end, payload length, crc32 of the payload. A
+# snapshot's payload is the whole text, a replace's the text put in place of
+# characters start..end.
+RECORD = struct.Struct("<BIIII")
+SNAPSHOT = 0
+REPLACE = 1
+
+# A journal is rewritten as one snapshot after this many replace records
+COMPACT_RECORDS = 200
+
+
+def journal_directory(project: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(project).encode()).hexdigest()
+    return os.path.join(JOURNAL_DIR, digest)
+
+
+def encode(text: str) -> bytes:
+    return text.encode("utf-8", "surrogatepass")
+
+
+def record(kind: int, start: int, end: int, text: str) -> bytes:
+    payload = encode(text)
+    header = RECORD.pack(kind, start, end, len(payload), zlib.crc32(payload))
+    return header + payload
+
+
+def read_journal(path: str):
+    # (buffer path, text) replayed from a journal file, or None if it holds
+    # no snapshot. A torn or corrupt record ends the replay, so a crash while
+    # appending only loses that last record.
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC or len(data) < 4 + HEADER.size:
+        return None
+    version, length = HEADER.unpack_from(data, 4)
+    if version != JOURNAL_VERSION:
+        return None
+    pos = 4 + HEADER.size
+    buffer_path = data[pos : pos + length].decode("utf-8", "surrogatepass")
+    pos += length
+
+    text = None
+    while pos + RECORD.size <= len(data):
+        kind, start, end, size, crc = RECORD.unpack_from(data, pos)
+        payload = data[pos + RECORD.size : pos + RECORD.size + size]
+        if len(payload) != size or zlib.crc32(payload) != crc:
+            break
+        pos += RECORD.size + size
+        value = payload.decode("utf-8", "surrogatepass")
+        if kind == SNAPSHOT:
+            text = value
+        elif kind == REPLACE and text is not None:
+            text = text[:start] + value + text[end:]
+        else:
+            break
+    if text is None:
+        return None
+    return buffer_path, text
+
+
+class EditJournal:
+    # Append-only journals of the unsaved edits of each buffer, so they can
+    # be replayed after a crash. The editor hands over the buffer text now
+    # and then; diffing, writing and compacting happen on a worker thread.
+    def __init__(self, project: str):
+        self.directory = journal_directory(project)
+        self.jobs = queue.Queue()
+        # Buffer path -> (journal file, last journaled text, record count)
+        self.journals = {}
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.worker.start()
+
+    def file_path(self, path: str) -> str:
+        digest = hashlib.sha1(path.encode("utf-8", "surrogatepass")).hexdigest()
+        return os.path.join(self.directory, digest + ".journal")
+
+    def recover(self) -> list:
+        # (buffer path, text) of every journal left behind by a session that
+        # did not shut down cleanly
+        recovered = []
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return recovered
+        for name in names:
+            if not name.endswith(".journal"):
+                continue
+            try:
+                result = read_journal(os.path.join(self.directory, name))
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Error reading edit journal: {e}")
+                continue
+            if result is not None:
+                recovered.append(result)
+        return recovered
+
+    def update(self, path: str, text: str, saved_hash):
+        # Journals `text` for the buffer at `path`, or drops its journal when
+        # the text is what was last saved
+        self.jobs.put(("update", path, text, saved_hash))
+
+    def discard(self, path: str):
+        self.jobs.put(("discard", path, None, None))
+
+    def close(self):
+        # Waits for pending writes. Journals of unsaved buffers stay on disk
+        # for the next start.
+        self.jobs.put(None)
+        self.worker.join()
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                for f, _, _ in self.journals.values():
+                    f.close()
+                self.journals.clear()
+                return
+            # Only the newest text of a buffer matters, so queued updates
+            # are written as one
+            jobs = [job]
+            while True:
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self.jobs.put(None)
+                    break
+                jobs.append(job)
+            latest = {}
+            for kind, path, text, saved_hash in jobs:
+                latest.pop(path, None)
+                latest[path] = (kind, text, saved_hash)
+
+            for path, (kind, text, saved_hash) in latest.items():
+                try:
+                    if kind == "discard" or content_hash(text) == saved_hash:
+                        self.remove(path)
+                    else:
+                        self.write(path, text)
+                except OSError as e:
+                    print(f"Error writing edit journal: {e}")
+
+    def remove(self, path: str):
+        journal = self.journals.pop(path, None)
+        if journal is not None:
+            journal[0].close()
+        try:
+            os.remove(self.file_path(path))
+        except FileNotFoundError:
+            pass
+
+    def write(self, path: str, text: str):
+        journal = self.journals.get(path)
+        if journal is None or journal[2] >= COMPACT_RECORDS:
+            self.snapshot(path, text)
+            return
+        f, old, count = journal
+        if text == old:
+            return
+        prefix = common_prefix_length(old, text)
+        suffix = common_suffix_length(old, text, min(len(old), len(text)) - prefix)
+        f.write(
+            record(
+                REPLACE, prefix, len(old) - suffix, text[prefix : len(text) - suffix]
+            )
+        )
+        f.flush()
+        self.journals[path] = (f, text, count + 1)
+
+    def snapshot(self, path: str, text: str):
+        # Starts the journal over with the whole text, replacing the old
+        # one in a single rename
+        journal = self.journals.pop(path, None)
+        if journal is not None:
+            journal[0].close()
+        os.makedirs(self.directory, exist_ok=True)
+        file_path = self.file_path(path)
+        encoded_path = encode(path)
+        with open(file_path + ".tmp", "wb") as f:
+            f.write(MAGIC + HEADER.pack(JOURNAL_VERSION, len(encoded_path)))
+            f.write(encoded_path)
+            f.write(record(SNAPSHOT, 0, 0, text))
+        os.replace(file_path + ".tmp", file_path)
+        self.journals[path] = (open(file_path, "ab"), text, 0)
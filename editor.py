@@ -1,37 +1,130 @@
-import json
+import bisect
 import os
-import re
+import queue
 import shutil
 import subprocess
-import importlib
-from keyword import kwlist
+import re
+import threading
 from tkinter import *
+from tkinter import messagebox
 from tkinter.filedialog import asksaveasfilename
 from tkinter.ttk import Combobox, Style
 from types import new_class
 
+import completion_data
+from autocomplete_popup import AutocompletePopup
+from completion_index import BufferSymbols, FuzzyIndex, candidate, merge_rankings, rank
+from edit_journal import EditJournal
+from editor_buffer import MAX_RESIDENT_BUFFERS, EditorBuffer, content_hash
+from file_index import FileIndex
+from file_saver import FileSaver
+from hot_reload import PORT_VARIABLE, ReloadServer, module_name
+from idle_scheduler import IdleScheduler
+from large_file import LARGE_FILE_SIZE, ChunkedLoader
+from output_pane import OutputPane, read_output
+from project_index import ProjectIndex
+from project_search import (
+    MAX_RESULTS,
+    ProjectSearch,
+    SearchPools,
+    replacements,
+    unified_diff,
+)
+from scope_completion import ParsePool, ScopeCompletion
 from settings_manager import SettingsManager
 from style_manager import StyleManager
 from syntax_highlighter import SyntaxHighlighter
 
+# How often (ms) to check for a finished project index refresh
+PROJECT_INDEX_POLL_DELAY = 500
+
+# How often (ms) the quick-open palette checks the project for new files
+FILE_INDEX_POLL_DELAY = 1000
+
+# Files listed in the quick-open palette
+QUICK_OPEN_RESULTS = 50
+
+# How often (ms) the find in files pane collects new results
+SEARCH_POLL_DELAY = 30
+
+# How often (ms) the game's output is added to the output pane
+OUTPUT_DRAIN_DELAY = 50
+# Characters of output added per drain, give or take a chunk; the rest waits
+# for the next drain so a chatty game cannot hold up the editor
+MAX_OUTPUT_BATCH = 64 * 1024
+# Chunks of output waiting at most; past that the game blocks on printing
+OUTPUT_QUEUE_SIZE = 256
+# Time (ms) a stopped game gets to exit before it is killed
+STOP_TIMEOUT = 2000
+
+# How often (ms) to check for finished background saves
+SAVE_POLL_DELAY = 50
+
+# Typing pause (ms) before the buffer is parsed again for completion
+PARSE_DELAY = 400
+# How often (ms) to check for a finished parse
+PARSE_POLL_DELAY = 50
+
+# Order of the jobs a keystroke schedules: the popup first, then colors, then
+# the scope parse
+COMPLETE_PRIORITY = 0
+HIGHLIGHT_PRIORITY = 1
+PARSE_PRIORITY = 2
+JOURNAL_PRIORITY = 3
+
+# Longest time (ms) typed text goes without being journaled
+JOURNAL_DELAY = 1000
+
 
 class GameEditor:
     def __init__(self, name: str, directory: str):
         self.win = Tk()
         self.win.attributes("-zoomed", True)
         self.win.title(name)
+        self.scheduler = IdleScheduler(self.win)
         self.directory = directory
         self.current_file = None
+        # Open files by path, in tab order
+        self.buffers = {}
+        self.active = None
+        self.uses = 0
         self.game_process = None
         self.output_thread = None
+        self.output_queue = None
+        self.output_closed = False
+        self.output_id = None
+        self.kill_id = None
+        self.restart_pending = False
+        # Tells the running game which modules were saved
+        self.reload_server = None
         self.settings_manager = SettingsManager()
+        self.saver = FileSaver(
+            self.settings_manager.settings.get("fsync_on_save", True)
+        )
+        self.save_poll_id = None
+        # Tabs closed with "Save" whose write is not confirmed yet, by path
+        self.closing = {}
+        # Paths saved with "Save As" whose write is not confirmed yet
+        self.saving_as = set()
+        # Unsaved edits, replayed if the editor goes down before a save
+        self.journal = EditJournal(self.directory)
+        # Files quick-open offers, first listed in the background
+        self.file_index = FileIndex(self.directory)
+        threading.Thread(target=self.file_index.refresh, daemon=True).start()
+        # Find and replace in files over the same files, each with its own
+        # pane and sharing the search processes
+        self.search_pools = SearchPools()
+        # Buffers are parsed for scope completion in their own process
+        self.parse_pool = ParsePool()
+        self.parse_poll_id = None
+        self.project_search = ProjectSearch(self.directory, self.search_pools)
+        self.project_replace = ProjectSearch(self.directory, self.search_pools)
+        self.search_popup = None
+        self.replace_popup = None
 
         self.name = name
 
         # Autocomplete setup
-        self.autocomplete_popup = None
-        self.autocomplete_listbox = None
-        self.autocomplete_suggestions = []
         self.setup_autocomplete_data()
 
         self.pad = 5
@@ -50,6 +143,10 @@ class GameEditor:
 
         save_btn = Button(top_bar, text="Save", command=self.save_file)
 
+        find_btn = Button(top_bar, text="Find", command=self.find_in_files)
+
+        replace_btn = Button(top_bar, text="Replace", command=self.replace_in_files)
+
         compile_btn = Button(top_bar, text="Compile", command=self.compile)
 
         start_btn = Button(top_bar, text="Debug", command=self.debug)
@@ -58,133 +155,921 @@ class GameEditor:
             top_bar, text="Settings", command=self.settings_manager.open_settings
         )
 
-        text_frame = Frame(self.win)
-        self.text_editor = Text(text_frame, wrap="none", tabs="0.85c")
-        scrollbar = Scrollbar(text_frame, command=self.text_editor.yview)
+        self.tab_bar = Frame(self.win)
+        self.text_frame = Frame(self.win)
+        self.scrollbar = Scrollbar(self.text_frame)
+        self.text_editor = None
+        self.highlighter = None
 
         # Style Stuff
         self.style_manager.apply_to(top_bar)
         self.style_manager.apply_to(new_btn)
         self.style_manager.apply_to(open_btn)
         self.style_manager.apply_to(save_btn)
+        self.style_manager.apply_to(find_btn)
+        self.style_manager.apply_to(replace_btn)
         self.style_manager.apply_to(start_btn)
         self.style_manager.apply_to(compile_btn)
         self.style_manager.apply_to(settings_btn)
-        self.style_manager.apply_to(text_frame)
-        self.style_manager.apply_to(self.text_editor)
-
-        # Syntax Highlighting
-        self.highlighter = SyntaxHighlighter(
-            self.text_editor, "python", self.style_manager.current_theme
+        self.style_manager.apply_to(self.tab_bar)
+        self.style_manager.apply_to(self.text_frame)
+
+        self.output_pane = OutputPane(
+            self.win,
+            self.style_manager,
+            lambda frame: frame.grid(row=3, column=0, sticky="nsew", padx=pad),
+            self.debug,
+            self.stop_game,
         )
 
-        self.text_editor.config(yscrollcommand=scrollbar.set)
+        self.autocomplete = AutocompletePopup(
+            self.win,
+            self.style_manager,
+            self.insert_suggestion,
+            self.describe_suggestion,
+        )
 
         # pack stuff 2 top bar
         settings_btn.pack(side="left", padx=pad)
         new_btn.pack(side="left", padx=pad)
         open_btn.pack(side="left", padx=pad)
         save_btn.pack(side="left", padx=pad)
+        find_btn.pack(side="left", padx=pad)
+        replace_btn.pack(side="left", padx=pad)
         start_btn.pack(side="right", padx=pad)
         compile_btn.pack(side="right", padx=pad)
 
         # pack stuff 2 window
-        self.text_editor.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        self.scrollbar.pack(side="right", fill="y")
 
-        self.win.grid_rowconfigure(1, weight=1)
+        self.win.grid_rowconfigure(2, weight=1)
         self.win.grid_columnconfigure(0, weight=1)
         top_bar.grid(row=0, column=0, sticky="ew", padx=pad, pady=pad)
-        text_frame.grid(row=1, column=0, sticky="nsew", padx=pad, pady=pad)
+        self.tab_bar.grid(row=1, column=0, sticky="ew", padx=pad)
+        self.text_frame.grid(row=2, column=0, sticky="nsew", padx=pad, pady=pad)
 
         # Key bindings
         self.win.bind("<Control-o>", lambda event: self.open_file())
         self.win.bind("<Control-s>", lambda event: self.save_file())
         self.win.bind("<Control-Shift-S>", lambda event: self.save_file_as())
+        self.win.bind("<Control-Alt-s>", lambda event: self.save_all())
         self.win.bind("<Control-n>", lambda event: self.new_file())
+        self.win.bind("<Control-Shift-F>", lambda event: self.find_in_files())
+        self.win.bind("<Control-Shift-H>", lambda event: self.replace_in_files())
         self.win.bind("<F5>", lambda event: self.debug())
+        self.win.bind("<Shift-F5>", lambda event: self.stop_game())
         self.win.bind("<Control-Shift-C>", lambda event: self.compile())
         self.win.bind("<Control-Shift-R>", lambda event: self.reload())
-
-        # Auto-completion key bindings
-        self.text_editor.bind("(", lambda event: self.close("(", event))
-        self.text_editor.bind("[", lambda event: self.close("[", event))
-        self.text_editor.bind("{", lambda event: self.close("{", event))
-        self.text_editor.bind('"', lambda event: self.close('"', event))
-        self.text_editor.bind("'", lambda event: self.close("'", event))
-        self.text_editor.bind("<Control-space>", lambda event: self.show_autocomplete())
-        self.text_editor.bind("<KeyRelease>", self.on_key_release)
-        self.text_editor.bind("<Control-Tab>", lambda event: self.show_snippet_menu())
-        self.text_editor.bind("<Return>", self.auto_indentation)
-        self.text_editor.bind("<Tab>", self.insert_indentation)
-
-        # Make Key Binds Work
-        self.text_editor.focus_set()
+        self.win.bind("<Control-w>", lambda event: self.close_buffer(self.active))
+        self.win.bind("<Control-e>", lambda event: self.make_editable())
 
         self.force_open_file("main.py")
+        self.recover_journals()
+
+        # Symbols from the other modules of the project
+        self.project_index = ProjectIndex(self.directory)
+        self.update_project_completions()
+        self.project_index.refresh()
+        self.poll_project_index()
 
         self.win.mainloop()
+        self.saver.wait()
+        self.journal.close()
+        self.project_index.close()
+        self.search_pools.close()
+        self.parse_pool.close()
+        if self.game_process is not None:
+            self.game_process.terminate()
 
     def reload(self):
         self.win.withdraw()
         GameEditor(self.name, self.directory)
 
     def open_file(self):
+        # Quick-open palette: type part of a path, Return opens the best match
         popup = Toplevel(self.win)
         popup.title("Open File")
-        popup.geometry("400x300")
+        popup.geometry("500x350")
         popup.resizable(False, False)
 
+        entry = Entry(popup)
         scrollbar = Scrollbar(popup)
-        list_of_files = []
-        listbox = Listbox(popup)
+        listbox = Listbox(popup, activestyle="none")
+
+        self.style_manager.apply_to(popup)
+        self.style_manager.apply_to(entry)
+        self.style_manager.apply_to(listbox)
 
-        for root, _, files in os.walk(self.directory):
-            for file in files:
-                if file.endswith((".py", ".json")):
-                    rel_dir = os.path.relpath(root, self.directory)
-                    rel_file = os.path.join(rel_dir, file) if rel_dir != "." else file
-                    if not rel_dir.startswith("scripts/built_in"):
-                        list_of_files.append(rel_file)
+        entry.pack(side="top", fill="x", padx=self.pad, pady=self.pad)
+        listbox.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
 
-        for file in list_of_files:
-            listbox.insert("end", file)
+        listbox.config(yscrollcommand=scrollbar.set)
+        scrollbar.config(command=listbox.yview)
 
-        self.style_manager.apply_to(popup)
+        # The search data the list was last filled from
+        shown = [None]
+
+        def update():
+            shown[0] = self.file_index.search_data
+            results = self.file_index.search(entry.get(), QUICK_OPEN_RESULTS)
+            listbox.delete(0, "end")
+            if results:
+                listbox.insert("end", *results)
+                listbox.selection_set(0)
+                listbox.see(0)
+
+        def on_key_release(event):
+            if event.keysym not in ("Up", "Down", "Return", "Escape"):
+                update()
+
+        def move(step: int):
+            selection = listbox.curselection()
+            size = listbox.size()
+            if size:
+                index = min(
+                    max((selection[0] if selection else -1) + step, 0), size - 1
+                )
+                listbox.selection_clear(0, "end")
+                listbox.selection_set(index)
+                listbox.see(index)
+            return "break"
+
+        def open_selected(event=None):
+            selection = listbox.curselection()
+            if selection:
+                file = listbox.get(selection[0])
+                popup.destroy()
+                self.force_open_file(file)
+
+        def poll():
+            # New and deleted files show up while the palette is open
+            if not popup.winfo_exists():
+                return
+            # Skipped while the startup scan runs, its files show up once
+            # it swaps them in
+            self.file_index.refresh(blocking=False)
+            if shown[0] is not self.file_index.search_data:
+                update()
+            popup.after(FILE_INDEX_POLL_DELAY, poll)
+
+        entry.bind("<KeyRelease>", on_key_release)
+        entry.bind("<Down>", lambda event: move(1))
+        entry.bind("<Up>", lambda event: move(-1))
+        entry.bind("<Return>", open_selected)
+        listbox.bind("<Double-1>", open_selected)
+        popup.bind("<Escape>", lambda event: popup.destroy())
+
+        # What is indexed so far, poll() lists the directories whose mtime
+        # changed
+        update()
+        entry.focus_set()
+        popup.after_idle(poll)
+
+    def find_in_files(self):
+        # Results are added to the list as the search processes find them
+        if self.search_popup is not None and self.search_popup.winfo_exists():
+            self.search_popup.lift()
+            self.search_popup.focus_force()
+            return
+        popup = Toplevel(self.win)
+        self.search_popup = popup
+        popup.title("Find in Files")
+        popup.geometry("700x400")
+
+        search_bar = Frame(popup)
+        entry = Entry(search_bar)
+        regex = BooleanVar(popup)
+        case = BooleanVar(popup)
+        regex_check = Checkbutton(search_bar, text="Regex", variable=regex)
+        case_check = Checkbutton(search_bar, text="Match case", variable=case)
+        status = Label(popup, anchor="w")
+        scrollbar = Scrollbar(popup)
+        listbox = Listbox(popup, activestyle="none", font=("Courier", 10))
+        results = []
+
+        for widget in (popup, search_bar, entry, regex_check, case_check):
+            self.style_manager.apply_to(widget)
+        self.style_manager.apply_to(status)
         self.style_manager.apply_to(listbox)
 
+        entry.pack(side="left", fill="x", expand=True)
+        case_check.pack(side="right", padx=self.pad)
+        regex_check.pack(side="right", padx=self.pad)
+        search_bar.pack(side="top", fill="x", padx=self.pad, pady=self.pad)
+        status.pack(side="bottom", fill="x")
         listbox.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
 
         listbox.config(yscrollcommand=scrollbar.set)
         scrollbar.config(command=listbox.yview)
 
-        listbox.bind(
-            "<Double-1>",
-            lambda event: [self.force_open_file(listbox.get(ACTIVE)), popup.destroy()],
-        )
+        def show_status():
+            files = len({result[0] for result in results})
+            text = f"{len(results)} results in {files} files"
+            if len(results) >= MAX_RESULTS:
+                text += " (stopped at the limit)"
+            elif self.project_search.running():
+                text += ", searching..."
+            status.config(text=text)
+
+        def poll():
+            if not popup.winfo_exists():
+                return
+            found = self.project_search.poll()
+            if found:
+                results.extend(found)
+                listbox.insert(
+                    "end",
+                    *(
+                        f"{name}:{line}: {text.strip()}"
+                        for name, line, _, _, text in found
+                    ),
+                )
+            show_status()
+            if self.project_search.running():
+                popup.after(SEARCH_POLL_DELAY, poll)
+
+        def search(event=None):
+            query = entry.get()
+            if not query:
+                return
+            running = self.project_search.running()
+            try:
+                self.project_search.search(query, regex.get(), case.get())
+            except re.error as e:
+                status.config(text=f"Invalid regex: {e}")
+                return
+            results.clear()
+            listbox.delete(0, "end")
+            show_status()
+            # A search started while another ran reuses its polling
+            if not running:
+                popup.after(SEARCH_POLL_DELAY, poll)
+
+        def open_selected(event=None):
+            selection = listbox.curselection()
+            if selection:
+                name, line, start, end, _ = results[selection[0]]
+                self.open_location(name, line, start, end)
+
+        def close(event=None):
+            self.project_search.cancel()
+            popup.destroy()
+
+        entry.bind("<Return>", search)
+        listbox.bind("<Return>", open_selected)
+        listbox.bind("<Double-1>", open_selected)
+        popup.bind("<Escape>", close)
+        popup.protocol("WM_DELETE_WINDOW", close)
+
+        entry.focus_set()
+        self.project_search.prepare()
+
+    def replace_in_files(self):
+        # Preview diffs stream in as the search processes find matches;
+        # Replace All then writes each previewed file atomically
+        if self.replace_popup is not None and self.replace_popup.winfo_exists():
+            self.replace_popup.lift()
+            self.replace_popup.focus_force()
+            return
+        popup = Toplevel(self.win)
+        self.replace_popup = popup
+        popup.title("Replace in Files")
+        popup.geometry("800x500")
+
+        find_bar = Frame(popup)
+        replace_bar = Frame(popup)
+        find_lbl = Label(find_bar, text="Find:", width=8, anchor="w")
+        find_entry = Entry(find_bar)
+        replace_lbl = Label(replace_bar, text="Replace:", width=8, anchor="w")
+        replace_entry = Entry(replace_bar)
+        regex = BooleanVar(popup)
+        case = BooleanVar(popup)
+        regex_check = Checkbutton(find_bar, text="Regex", variable=regex)
+        case_check = Checkbutton(find_bar, text="Match case", variable=case)
+        preview_btn = Button(replace_bar, text="Preview")
+        replace_btn = Button(replace_bar, text="Replace All")
+        status = Label(popup, anchor="w")
+        scrollbar = Scrollbar(popup)
+        diff = Text(popup, wrap="none", state="disabled", font=("Courier", 10))
+
+        for widget in (
+            popup,
+            find_bar,
+            replace_bar,
+            find_lbl,
+            find_entry,
+            replace_lbl,
+            replace_entry,
+            regex_check,
+            case_check,
+            preview_btn,
+            replace_btn,
+            status,
+            diff,
+        ):
+            self.style_manager.apply_to(widget)
+        theme = self.style_manager.current_theme
+        syntax = theme.get("syntax", {})
+        diff.tag_configure("file", foreground=theme["accent"])
+        diff.tag_configure("removed", foreground=syntax.get("string", "#ce9178"))
+        diff.tag_configure("added", foreground=syntax.get("comment", "#6a9955"))
+
+        find_lbl.pack(side="left")
+        find_entry.pack(side="left", fill="x", expand=True)
+        case_check.pack(side="right", padx=self.pad)
+        regex_check.pack(side="right", padx=self.pad)
+        replace_lbl.pack(side="left")
+        replace_entry.pack(side="left", fill="x", expand=True)
+        replace_btn.pack(side="right", padx=self.pad)
+        preview_btn.pack(side="right", padx=self.pad)
+        find_bar.pack(side="top", fill="x", padx=self.pad, pady=(self.pad, 0))
+        replace_bar.pack(side="top", fill="x", padx=self.pad, pady=self.pad)
+        status.pack(side="bottom", fill="x")
+        diff.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        diff.config(yscrollcommand=scrollbar.set)
+        scrollbar.config(command=diff.yview)
+
+        # (path, replacements, digest) of the files the preview would change
+        # on disk, and (path, replacements) of open files with unsaved
+        # changes, which are only changed in their buffers
+        planned = []
+        unsaved = []
+        # The replace running, if any: [files done, replacements, failures]
+        applied = []
+
+        def show_diff(text: str):
+            diff.configure(state="normal")
+            for line in text.splitlines():
+                if line.startswith(("---", "+++")):
+                    tag = "file"
+                elif line.startswith("-"):
+                    tag = "removed"
+                elif line.startswith("+"):
+                    tag = "added"
+                else:
+                    tag = ()
+                diff.insert("end", line + "\n", tag)
+            diff.configure(state="disabled")
+
+        def show_status():
+            files = planned + unsaved
+            count = sum(entry[1] for entry in files)
+            text = f"{count} replacements in {len(files)} files"
+            if unsaved:
+                text += f" ({len(unsaved)} open with unsaved changes)"
+            if self.project_replace.running():
+                text += ", searching..."
+            status.config(text=text)
+
+        def buffers_by_name() -> dict:
+            buffers = {}
+            for buffer in self.buffers.values():
+                name = os.path.relpath(buffer.path, self.directory)
+                if not name.startswith(".."):
+                    buffers[name.replace(os.sep, "/")] = buffer
+            return buffers
+
+        def poll_preview():
+            if not popup.winfo_exists() or applied:
+                return
+            for name, count, digest, text in self.project_replace.poll():
+                planned.append((name, count, digest))
+                show_diff(text)
+            show_status()
+            if self.project_replace.running():
+                popup.after(SEARCH_POLL_DELAY, poll_preview)
+
+        def preview(event=None):
+            query = find_entry.get()
+            if not query or applied:
+                return
+            running = self.project_replace.running()
+            # Open files with unsaved changes are previewed from their text
+            modified = {
+                name: buffer
+                for name, buffer in buffers_by_name().items()
+                if buffer.modified()
+            }
+            try:
+                self.project_replace.preview(
+                    query,
+                    replace_entry.get(),
+                    regex.get(),
+                    case.get(),
+                    skip=modified,
+                )
+            except re.error as e:
+                status.config(text=f"Invalid regex: {e}")
+                return
+            planned.clear()
+            unsaved.clear()
+            diff.configure(state="normal")
+            diff.delete("1.0", "end")
+            diff.configure(state="disabled")
+
+            search = self.project_replace
+            for name, buffer in modified.items():
+                text = buffer.get_text()
+                edits = replacements(
+                    search.pattern, search.flags, search.template, text
+                )
+                if edits:
+                    new = re.compile(search.pattern, search.flags).sub(
+                        search.template, text
+                    )
+                    unsaved.append((name, len(edits)))
+                    show_diff(unified_diff(name, text, new))
+            show_status()
+            if not running:
+                popup.after(SEARCH_POLL_DELAY, poll_preview)
+
+        def poll_replace():
+            buffers = buffers_by_name()
+            for name, count, error in self.project_replace.poll():
+                if error is not None:
+                    applied[2].append(f"{name}: {error}")
+                    continue
+                applied[0] += 1
+                applied[1] += count
+                buffer = buffers.get(name)
+                if buffer is not None:
+                    self.replace_in_buffer(buffer, saved=True)
+            if self.project_replace.running():
+                status.config(
+                    text=f"Replaced in {applied[0]} of {len(planned)} files..."
+                )
+                self.win.after(SEARCH_POLL_DELAY, poll_replace)
+                return
+
+            files, count, failures = applied
+            applied.clear()
+            planned.clear()
+            unsaved.clear()
+            self.project_index.refresh()
+            if popup.winfo_exists():
+                status.config(text=f"{count} replacements in {files} files")
+            if failures:
+                messagebox.showwarning(
+                    "Replace in Files",
+                    "Some files were not changed:\n" + "\n".join(failures),
+                )
+
+        def replace_all():
+            if self.project_replace.running() or applied:
+                return
+            files = len(planned) + len(unsaved)
+            count = sum(entry[1] for entry in planned + unsaved)
+            if not files or not messagebox.askyesno(
+                "Replace in Files",
+                f"Replace {count} matches in {files} files?",
+                parent=popup,
+            ):
+                return
+            # Tabs closed since the preview are left out
+            buffers = buffers_by_name()
+            applied.extend([0, 0, []])
+            for name, count in unsaved:
+                buffer = buffers.get(name)
+                if buffer is None:
+                    applied[2].append(f"{name}: closed since the preview")
+                    continue
+                self.replace_in_buffer(buffer)
+                applied[0] += 1
+                applied[1] += count
+            self.project_replace.replace(
+                [(name, digest) for name, _, digest in planned],
+                self.saver.fsync,
+            )
+            self.win.after(SEARCH_POLL_DELAY, poll_replace)
+
+        def close(event=None):
+            # A replace already started runs to the end
+            if not applied:
+                self.project_replace.cancel()
+            popup.destroy()
+
+        preview_btn.config(command=preview)
+        replace_btn.config(command=replace_all)
+        find_entry.bind("<Return>", preview)
+        replace_entry.bind("<Return>", preview)
+        popup.bind("<Escape>", close)
+        popup.protocol("WM_DELETE_WINDOW", close)
+
+        find_entry.focus_set()
+        self.project_replace.prepare()
+
+    def replace_in_buffer(self, buffer: EditorBuffer, saved: bool = False):
+        # Applies the last replace to an open file in place, as one undoable
+        # edit. `saved`: the file on disk was replaced as well, so a buffer
+        # without changes of its own stays unmodified.
+        search = self.project_replace
+        if buffer.read_only:
+            return
+        unmodified = not buffer.modified()
+        if buffer.resident():
+            text = buffer.get_text()
+            line_starts = [0] + [match.end() for match in re.finditer("\n", text)]
+
+            def position(offset: int) -> str:
+                line = bisect.bisect_right(line_starts, offset)
+                return f"{line}.{offset - line_starts[line - 1]}"
+
+            widget = buffer.text
+            autoseparators = widget.cget("autoseparators")
+            widget.configure(autoseparators=False)
+            widget.edit_separator()
+            for start, end, new in reversed(
+                replacements(search.pattern, search.flags, search.template, text)
+            ):
+                widget.delete(position(start), position(end))
+                widget.insert(position(start), new)
+            widget.edit_separator()
+            widget.configure(autoseparators=autoseparators)
+            buffer.highlighter.highlight()
+            if buffer is self.active:
+                self.schedule_parse()
+        elif buffer.content is not None:
+            buffer.content = re.compile(search.pattern, search.flags).sub(
+                search.template, buffer.content
+            )
+
+        if saved and unmodified and buffer.resident():
+            buffer.saved_hash = content_hash(buffer.get_text())
+        elif saved and unmodified:
+            # A dropped buffer only needs the hash of the new file
+            self.refresh_buffer(buffer.path)
+        self.journal_buffer(buffer)
+
+    def open_location(self, file: str, line: int, start: int, end: int):
+        # Opens a file with the given part of a line selected
+        self.force_open_file(file)
+        path = os.path.abspath(f"{self.directory}/{file}")
+        if self.active is None or self.active.path != path:
+            return
+        self.text_editor.tag_remove("sel", "1.0", "end")
+        self.text_editor.tag_add("sel", f"{line}.{start}", f"{line}.{end}")
+        self.text_editor.mark_set(INSERT, f"{line}.{start}")
+        self.text_editor.see(INSERT)
+        self.text_editor.focus_set()
 
     def force_open_file(self, file: str):
         if not self.directory:
             return
 
-        with open(f"{self.directory}/{file}", "r") as f:
-            self.text_editor.delete(1.0, "end")
-            content = f.read()
-            self.text_editor.insert(1.0, content)
-            self.current_file = f"{self.directory}/{file}"
-            self.highlighter.highlight()
+        self.open_buffer(f"{self.directory}/{file}")
 
-    def save_file(self):
-        text = self.text_editor.get(1.0, "end")
-        if self.current_file:
-            with open(self.current_file, "w") as f:
-                f.write(text)
+    def create_text_editor(self) -> Text:
+        text_editor = Text(self.text_frame, wrap="none", tabs="0.85c", undo=True)
+        self.style_manager.apply_to(text_editor)
+
+        text_editor.config(
+            yscrollcommand=lambda first, last: self.on_scroll(text_editor, first, last)
+        )
+
+        # Auto-completion key bindings
+        text_editor.bind("(", lambda event: self.close("(", event))
+        text_editor.bind("[", lambda event: self.close("[", event))
+        text_editor.bind("{", lambda event: self.close("{", event))
+        text_editor.bind('"', lambda event: self.close('"', event))
+        text_editor.bind("'", lambda event: self.close("'", event))
+        text_editor.bind("<Control-space>", lambda event: self.show_autocomplete())
+        text_editor.bind("<KeyRelease>", self.on_key_release)
+        text_editor.bind("<Control-Tab>", lambda event: self.show_snippet_menu())
+        text_editor.bind("<Down>", self.navigate_suggestions)
+        text_editor.bind("<Up>", self.navigate_suggestions)
+        # Inserts the selected suggestion, or indents the new line
+        text_editor.bind("<Return>", self.handle_return)
+        text_editor.bind("<Tab>", self.insert_indentation)
+        text_editor.bind("<Control-Next>", lambda event: self.cycle_buffers(1))
+        text_editor.bind("<Control-Prior>", lambda event: self.cycle_buffers(-1))
+        return text_editor
+
+    def on_scroll(self, text_editor: Text, first, last):
+        # Hidden tabs scroll too when their text is replaced
+        if text_editor is self.text_editor:
+            self.scrollbar.set(first, last)
+            # Scrolling paints newly visible lines of large files
+            self.schedule_highlight()
+
+    def open_buffer(self, path: str, content: str = None, saved_hash=None):
+        # `content` opens the buffer with unsaved text instead of the file
+        path = os.path.abspath(path)
+        buffer = self.buffers.get(path)
+        if buffer is None:
+            # A tab closed while its save is still being written comes back
+            # with its text
+            buffer = self.closing.pop(path, None)
+            if buffer is None:
+                buffer = EditorBuffer(path)
+                buffer.content = content
+                buffer.saved_hash = saved_hash
+            try:
+                self.load_buffer(buffer)
+            except OSError as e:
+                print(f"Error opening file: {e}")
+                return
+            self.buffers[path] = buffer
+            buffer.tab = Button(
+                self.tab_bar,
+                text=self.tab_label(buffer),
+                command=lambda: self.switch_buffer(buffer),
+            )
+            buffer.tab.bind("<Button-2>", lambda event: self.close_buffer(buffer))
+            self.style_manager.apply_to(buffer.tab)
+            buffer.tab.pack(side="left", padx=(0, 2))
+        self.switch_buffer(buffer)
+
+    def load_buffer(self, buffer: EditorBuffer):
+        # Gives a new or dropped buffer its widget, from its unsaved text or
+        # the file
+        content = buffer.content
+        if content is None and os.path.getsize(buffer.path) > LARGE_FILE_SIZE:
+            self.load_large_buffer(buffer)
+            return
+        if content is None:
+            with open(buffer.path, "r") as f:
+                content = f.read()
+            buffer.saved_hash = content_hash(content)
+
+        self.create_buffer_state(buffer)
+        buffer.text.insert(1.0, content)
+        # Loading the file is not an undoable edit
+        buffer.text.edit_reset()
+        buffer.text.mark_set(INSERT, buffer.cursor)
+        buffer.text.yview_moveto(buffer.view)
+        buffer.content = None
+        buffer.highlighter.reset()
+        buffer.highlighter.highlight()
+
+    def create_buffer_state(self, buffer: EditorBuffer):
+        buffer.text = self.create_text_editor()
+        buffer.symbols = BufferSymbols(self.python_keywords)
+        buffer.scope = ScopeCompletion(self.parse_pool)
+        buffer.highlighter = SyntaxHighlighter(
+            buffer.text,
+            "python",
+            self.style_manager.current_theme,
+            buffer.symbols,
+        )
+
+    def load_large_buffer(self, buffer: EditorBuffer):
+        # Fills a read-only view a chunk at a time, highlighting stays off
+        # until the buffer is made editable
+        self.create_buffer_state(buffer)
+        buffer.read_only = True
+        buffer.text.configure(state="disabled", undo=False)
+
+        def progress(fraction: float):
+            buffer.tab.configure(text=self.tab_label(buffer, fraction))
+
+        def done(digest: bytes):
+            buffer.loader = None
+            buffer.saved_hash = digest
+            buffer.text.configure(undo=True)
+            buffer.text.mark_set(INSERT, buffer.cursor)
+            buffer.text.yview_moveto(buffer.view)
+            buffer.tab.configure(text=self.tab_label(buffer))
+
+        buffer.loader = ChunkedLoader(buffer.text, buffer.path, progress, done)
+
+    def make_editable(self):
+        # Leaves the read-only view of a large file once it is loaded
+        buffer = self.active
+        if not buffer.read_only or buffer.loader is not None:
+            return
+        buffer.read_only = False
+        buffer.text.configure(state="normal")
+        buffer.tab.configure(text=self.tab_label(buffer))
+        buffer.highlighter.reset()
+        buffer.highlighter.highlight()
+        self.schedule_parse()
+
+    def tab_label(self, buffer: EditorBuffer, progress: float = None) -> str:
+        label = os.path.basename(buffer.path)
+        if progress is not None:
+            label += f" ({progress:.0%})"
+        elif buffer.read_only:
+            label += " (read-only, Ctrl+E to edit)"
+        return label
+
+    def switch_buffer(self, buffer: EditorBuffer):
+        if buffer is not self.active:
+            self.hide_autocomplete()
+            if self.scheduler.scheduled("journal"):
+                self.scheduler.cancel("journal")
+                self.journal_buffer()
+            for job in ("complete", "highlight", "parse"):
+                self.scheduler.cancel(job)
+            if self.text_editor is not None:
+                self.text_editor.pack_forget()
+            if not buffer.resident():
+                self.load_buffer(buffer)
+
+            self.active = buffer
+            self.current_file = buffer.path
+            self.text_editor = buffer.text
+            self.highlighter = buffer.highlighter
+            self.buffer_symbols = buffer.symbols
+            self.scope_completion = buffer.scope
+            self.scrollbar.config(command=self.text_editor.yview)
+            self.text_editor.pack(side="left", fill="both", expand=True)
+            self.schedule_parse()
+
+        self.uses += 1
+        buffer.last_used = self.uses
+        self.update_tabs()
+        self.drop_buffers()
+        # Make Key Binds Work
+        self.text_editor.focus_set()
+
+    def update_tabs(self):
+        theme = self.style_manager.current_theme
+        for buffer in self.buffers.values():
+            if buffer is self.active:
+                buffer.tab.configure(bg=theme["accent"])
+            else:
+                buffer.tab.configure(bg=theme["bg_secondary"])
+
+    def drop_buffers(self):
+        # Frees the least recently used inactive widgets past the limit
+        resident = [
+            buffer
+            for buffer in self.buffers.values()
+            if buffer.resident() and buffer is not self.active
+        ]
+        resident.sort(key=lambda buffer: buffer.last_used)
+        for buffer in resident[: max(len(resident) - MAX_RESIDENT_BUFFERS, 0)]:
+            buffer.drop()
+
+    def cycle_buffers(self, step: int):
+        buffers = list(self.buffers.values())
+        if self.active in buffers:
+            index = buffers.index(self.active)
+            self.switch_buffer(buffers[(index + step) % len(buffers)])
+        return "break"
+
+    def close_buffer(self, buffer: EditorBuffer):
+        if buffer is None or len(self.buffers) == 1:
+            return
+        save = False
+        if buffer.modified():
+            save = messagebox.askyesnocancel(
+                "Unsaved Changes", f"Save changes to {os.path.basename(buffer.path)}?"
+            )
+            if save is None:
+                return
+            if save:
+                # Kept until poll_saves confirms the write
+                self.closing[buffer.path] = buffer
+                self.save_buffers([buffer])
+
+        buffers = list(self.buffers.values())
+        index = buffers.index(buffer)
+        del self.buffers[buffer.path]
+        buffer.tab.destroy()
+        if buffer is self.active:
+            self.switch_buffer(buffers[index + 1 if index == 0 else index - 1])
+        # The journal keeps the text being saved until poll_saves confirms
+        # it, switching away above may have journaled it too
+        if save:
+            self.journal_buffer(buffer)
         else:
-            self.save_file_as()
+            self.journal.discard(buffer.path)
+        if buffer.resident():
+            buffer.drop()
+
+    def refresh_buffer(self, path: str):
+        # Picks up a change made to an open file on disk, unless the buffer
+        # has unsaved changes of its own
+        buffer = self.buffers.get(os.path.abspath(path))
+        if buffer is None or buffer.read_only or buffer.modified():
+            return
+        try:
+            with open(path, "r") as f:
+                content = f.read()
+        except OSError as e:
+            print(f"Error reloading file: {e}")
+            return
+        buffer.saved_hash = content_hash(content)
+        if buffer.resident():
+            self.replace_buffer_text(buffer, content)
+
+    def replace_buffer_text(self, buffer: EditorBuffer, content: str):
+        # As one undoable edit, keeping the cursor where it was
+        cursor = buffer.text.index(INSERT)
+        buffer.text.edit_separator()
+        buffer.text.delete(1.0, "end-1c")
+        buffer.text.insert(1.0, content)
+        buffer.text.edit_separator()
+        buffer.text.mark_set(INSERT, cursor)
+        buffer.highlighter.reset()
+        buffer.highlighter.highlight()
+        if buffer is self.active:
+            self.schedule_parse()
+
+    def journal_buffer(self, buffer: EditorBuffer = None):
+        buffer = buffer or self.active
+        if buffer.resident() and not buffer.read_only:
+            self.journal.update(buffer.path, buffer.get_text(), buffer.saved_hash)
+
+    def recover_journals(self):
+        # Reopens the unsaved edits left in the journal by a session that
+        # ended without saving them
+        recovered = []
+        for path, text in self.journal.recover():
+            try:
+                with open(path, "r") as f:
+                    saved_hash = content_hash(f.read())
+            except OSError:
+                saved_hash = None
+            if content_hash(text) == saved_hash:
+                self.journal.discard(path)
+                continue
+
+            buffer = self.buffers.get(path)
+            if buffer is None:
+                self.open_buffer(path, text, saved_hash)
+            elif not buffer.read_only:
+                self.replace_buffer_text(buffer, text)
+            recovered.append(os.path.relpath(path, self.directory))
+            self.journal.update(path, text, saved_hash)
+
+        if recovered:
+            messagebox.showinfo(
+                "Recovered Changes",
+                "Unsaved changes were recovered for:\n" + "\n".join(recovered),
+            )
+
+    def save_file(self):
+        if self.active is not None:
+            self.save_buffers([self.active])
+
+    def save_all(self):
+        self.save_buffers(list(self.buffers.values()))
+
+    def save_buffers(self, buffers: list):
+        # Queues the buffers whose text changed since they were last saved
+        # as one batch for the background writer
+        files = []
+        for buffer in buffers:
+            if buffer.read_only:
+                continue
+            # Text ends with a newline Tk adds, which is not part of the file
+            text = buffer.get_text()
+            if text is None:
+                continue
+            digest = content_hash(text)
+            if digest != buffer.saved_hash:
+                files.append((buffer.path, text, (buffer, digest)))
+        if not files:
+            return
+        self.saver.save(files)
+        if self.save_poll_id is None:
+            self.save_poll_id = self.win.after(SAVE_POLL_DELAY, self.poll_saves)
+
+    def poll_saves(self):
+        self.save_poll_id = None
+        saved = []
+        failed = []
+        for path, (buffer, digest), error in self.saver.poll():
+            saved_as = path in self.saving_as
+            self.saving_as.discard(path)
+            if error is not None:
+                failed.append(f"{path}: {error}")
+                # A tab closed with its changes unsaved is opened again
+                if self.closing.get(buffer.path) is buffer:
+                    self.open_buffer(buffer.path)
+                continue
+            if saved_as:
+                print(f"Saved as: {path}")
+            buffer.saved_hash = digest
+            if not buffer.resident() and buffer.content is not None:
+                if content_hash(buffer.content) == digest:
+                    buffer.content = None
+            if buffer.resident():
+                self.journal_buffer(buffer)
+            elif buffer.content is None:
+                self.journal.discard(buffer.path)
+                if self.closing.get(buffer.path) is buffer:
+                    del self.closing[buffer.path]
+            saved.append(path)
+        if failed:
+            messagebox.showerror(
+                "Error Saving", "Could not save:\n" + "\n".join(failed)
+            )
+        if saved:
+            self.project_index.refresh()
+            self.reload_game(saved)
+        if self.saver.pending:
+            self.save_poll_id = self.win.after(SAVE_POLL_DELAY, self.poll_saves)
 
     def save_file_as(self):
-        text = self.text_editor.get(1.0, "end")
+        if self.active is None or self.active.read_only:
+            return
         file_path = asksaveasfilename(
             initialdir=self.directory,
             defaultextension=".py",
@@ -196,14 +1081,32 @@ class GameEditor:
         )
 
         if file_path:
-            try:
-                with open(file_path, "w") as f:
-                    f.write(text)
-                self.current_file = file_path
-                filename = file_path.split("/")[-1]
-                print(f"Saved as: {file_path}")
-            except Exception as e:
-                print(f"Error saving file: {e}")
+            self.rename_buffer(self.active, file_path)
+            # Written even if the text matches what the old path had
+            self.active.saved_hash = None
+            # Reported once poll_saves confirms the write
+            self.saving_as.add(self.active.path)
+            self.save_file()
+
+    def rename_buffer(self, buffer: EditorBuffer, path: str):
+        # A tab already open on the overwritten file is out of date
+        path = os.path.abspath(path)
+        self.journal.discard(buffer.path)
+        other = self.buffers.get(path)
+        if other is not None and other is not buffer:
+            self.journal.discard(other.path)
+            other.tab.destroy()
+            if other.resident():
+                other.drop()
+        self.buffers = {
+            (path if key == buffer.path else key): value
+            for key, value in self.buffers.items()
+            if value is not other
+        }
+        buffer.path = path
+        buffer.tab.configure(text=self.tab_label(buffer))
+        if buffer is self.active:
+            self.current_file = path
 
     def new_file(self):
         pad = self.pad
@@ -305,11 +1208,9 @@ class {class_name}:
 
                     with open(main_file_path, "w") as w:
                         w.write(updated_content)
+                    self.refresh_buffer(main_file_path)
 
-            with open(new_file_path, "r") as f:
-                self.text_editor.delete(1.0, "end")
-                self.text_editor.insert(1.0, f.read())
-                self.current_file = new_file_path
+            self.open_buffer(new_file_path)
             self.save_file()
 
         def create_new():
@@ -386,8 +1287,122 @@ class {class_name}:
             popup.mainloop()
 
     def debug(self):
-        self.save_file()
-        subprocess.run(["python", f"{self.directory}/game.py"])
+        self.save_all()
+        self.saver.wait()
+        self.run_game()
+
+    def run_game(self):
+        # Starts the game with its output going to the output pane, or
+        # restarts it once it has stopped
+        if self.game_process is not None:
+            self.restart_pending = True
+            self.terminate_game()
+            return
+
+        self.output_pane.clear()
+        self.output_pane.show()
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        try:
+            self.reload_server = ReloadServer()
+            env[PORT_VARIABLE] = str(self.reload_server.port)
+        except OSError as e:
+            print(f"Error starting hot reload: {e}")
+        try:
+            self.game_process = subprocess.Popen(
+                ["python", "game.py"],
+                cwd=self.directory,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                env=env,
+            )
+        except OSError as e:
+            self.output_pane.write(f"Could not start the game: {e}\n")
+            self.close_reload_server()
+            return
+        self.output_queue = queue.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+        self.output_closed = False
+        self.output_thread = threading.Thread(
+            target=read_output,
+            args=(self.game_process.stdout, self.output_queue),
+            daemon=True,
+        )
+        self.output_thread.start()
+        self.output_pane.set_status(f"Running game.py (pid {self.game_process.pid})")
+        self.output_id = self.win.after(OUTPUT_DRAIN_DELAY, self.drain_output)
+
+    def drain_output(self):
+        chunks = []
+        size = 0
+        while not self.output_closed and size < MAX_OUTPUT_BATCH:
+            try:
+                chunk = self.output_queue.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None:
+                self.output_closed = True
+            else:
+                chunks.append(chunk)
+                size += len(chunk)
+        if chunks:
+            self.output_pane.write("".join(chunks))
+        if self.reload_server is not None:
+            self.reload_server.poll()
+
+        code = self.game_process.poll() if self.output_closed else None
+        if code is None:
+            self.output_id = self.win.after(OUTPUT_DRAIN_DELAY, self.drain_output)
+            return
+
+        self.output_id = None
+        if self.kill_id is not None:
+            self.win.after_cancel(self.kill_id)
+            self.kill_id = None
+        self.game_process = None
+        self.output_thread = None
+        self.output_queue = None
+        self.close_reload_server()
+        self.output_pane.write(f"\n[Game exited with code {code}]\n")
+        self.output_pane.set_status(f"Game exited with code {code}")
+        if self.restart_pending:
+            self.restart_pending = False
+            self.run_game()
+
+    def close_reload_server(self):
+        if self.reload_server is not None:
+            self.reload_server.close()
+            self.reload_server = None
+
+    def reload_game(self, paths: list):
+        # Saved modules of the game take effect in it without a restart
+        if self.reload_server is None:
+            return
+        modules = []
+        for path in paths:
+            relative = os.path.relpath(path, self.directory).replace(os.sep, "/")
+            name = module_name(relative)
+            if name is not None:
+                modules.append(name)
+        if modules:
+            self.reload_server.send(modules)
+
+    def stop_game(self):
+        # Also cancels a restart asked for while the game was stopping
+        self.restart_pending = False
+        self.terminate_game()
+
+    def terminate_game(self):
+        # The output keeps being drained until the game has exited
+        if self.game_process is None or self.kill_id is not None:
+            return
+        self.output_pane.set_status("Stopping game...")
+        self.game_process.terminate()
+        self.kill_id = self.win.after(STOP_TIMEOUT, self.kill_game)
+
+    def kill_game(self):
+        self.kill_id = None
+        if self.game_process is not None and self.game_process.poll() is None:
+            self.game_process.kill()
 
     def close(self, char: str, event):
         chars = {"(": ")", "[": "]", "{": "}", '"': '"', "'": "'"}
@@ -403,62 +1418,26 @@ class {class_name}:
         return None
 
     def setup_autocomplete_data(self):
-        try:
-            with open("autocomplete_data.json", "r") as f:
-                data = json.load(f)
-
-            self.python_keywords = data.get("python_keywords", kwlist)
-            self.python_builtins = data.get("python_builtins", [])
-            self.pydot_functions = data.get("pydot_functions", [])
-            self.pydot_constants = data.get("pydot_constants", [])
-            self.pydot_modules = data.get("pydot_modules", [])
-            self.common_patterns = data.get("common_patterns", [])
-            self.code_snippets = data.get("code_snippets", {})
-        except FileNotFoundError:
-            # Fallback to basic data if config file doesn't exist
-            self.python_keywords = kwlist
-            self.python_builtins = [
-                "print",
-                "input",
-                "len",
-                "range",
-                "int",
-                "str",
-                "float",
-                "bool",
-                "list",
-                "dict",
-                "tuple",
-                "set",
-            ]
-            self.pydot_functions = [
-                "pygame.init",
-                "pygame.quit",
-                "pygame.display.set_mode",
-                "pygame.event.get",
-            ]
-            self.pydot_constants = []
-            self.pydot_modules = []
-            self.common_patterns = []
-            self.code_snippets = {}
+        # Shared with every other editor in this process
+        data = completion_data.load()
+        self.python_keywords = data.python_keywords
+        self.python_builtins = data.python_builtins
+        self.pydot_functions = data.pydot_functions
+        self.pydot_constants = data.pydot_constants
+        self.pydot_modules = data.pydot_modules
+        self.common_patterns = data.common_patterns
+        self.code_snippets = data.code_snippets
+        self.completion_index = data.index
+        self.describe_suggestion = data.describe
 
     def hide_autocomplete(self, event=None):
-        if self.autocomplete_popup:
-            self.autocomplete_popup.destroy()
-            self.autocomplete_popup = None
-            self.autocomplete_listbox = None
+        self.autocomplete.hide()
 
     def insert_suggestion(self, event=None):
-        if not self.autocomplete_listbox:
-            return "break"
-
-        # Get the selected item from the listbox
-        selection = self.autocomplete_listbox.curselection()
-        if not selection:
-            return "break"
-
         # Get the selected suggestion
-        suggestion = self.autocomplete_suggestions[selection[0]]
+        suggestion = self.autocomplete.selection()
+        if suggestion is None:
+            return "break"
 
         # Get the current cursor position and line content
         cursor_pos = self.text_editor.index(INSERT)
@@ -495,8 +1474,12 @@ class {class_name}:
         return "break"
 
     def on_key_release(self, event):
+        if self.active.read_only:
+            return
+
         # Hide autocomplete for Escape
         if event.keysym == "Escape":
+            self.scheduler.cancel("complete")
             self.hide_autocomplete()
             return
 
@@ -517,6 +1500,17 @@ class {class_name}:
         ]:
             return
 
+        # Keys typed faster than Tk goes idle share one run of each job
+        self.scheduler.schedule("complete", self.update_autocomplete, COMPLETE_PRIORITY)
+        self.schedule_highlight()
+        self.schedule_parse()
+        # Throttled rather than debounced, so long typing runs get journaled
+        if not self.scheduler.scheduled("journal"):
+            self.scheduler.schedule(
+                "journal", self.journal_buffer, JOURNAL_PRIORITY, JOURNAL_DELAY
+            )
+
+    def update_autocomplete(self):
         # Get current word being typed
         current_word = self.get_current_word()
 
@@ -526,10 +1520,8 @@ class {class_name}:
         else:
             self.hide_autocomplete()
 
-        self.highlighter.highlight()
-
     def handle_return(self, event=None):
-        if self.autocomplete_popup is not None:
+        if self.autocomplete.visible:
             self.insert_suggestion()
             self.hide_autocomplete()
             return "break"
@@ -553,79 +1545,65 @@ class {class_name}:
         return line_text[word_start:]
 
     def get_suggestions(self, partial_word):
-        suggestions = []
-        partial_lower = partial_word.lower()
-
-        # Add Python keywords
-        for kw in self.python_keywords:
-            if kw.startswith(partial_lower):
-                suggestions.append(kw)
-
-        # Add Python built-ins
-        for builtin in self.python_builtins:
-            if builtin.startswith(partial_lower):
-                suggestions.append(builtin)
-
-        # Add pygame functions
-        for func in self.pydot_functions:
-            if func.lower().startswith(partial_lower):
-                suggestions.append(func)
-
-        # Add pygame constants
-        for const in self.pydot_constants:
-            if const.lower().startswith(partial_lower):
-                suggestions.append(const)
-
-        # Add pygame modules
-        for module in self.pydot_modules:
-            if module.lower().startswith(partial_lower):
-                suggestions.append(module)
-
-        # Add common patterns
-        for pattern in self.common_patterns:
-            if pattern.lower().startswith(partial_lower):
-                suggestions.append(pattern)
-
-        # Add context-specific suggestions
-        context_suggestions = self.get_context_suggestions(partial_word)
-        suggestions.extend(context_suggestions)
-
-        # Add code snippets that match
-        for snippet_name in self.code_snippets:
-            if snippet_name.lower().startswith(partial_lower):
-                suggestions.append(f"snippet:{snippet_name}")
-
-        return sorted(list(set(suggestions)))
+        # Static vocabulary, project symbols and names from the buffer, best
+        # fuzzy matches first
+        return merge_rankings(
+            self.completion_index.search(partial_word),
+            self.project_completions.search(partial_word),
+            rank(
+                partial_word,
+                [
+                    candidate(name, name)
+                    for name in self.get_context_suggestions(partial_word)
+                ],
+            ),
+        )
+
+    def update_project_completions(self):
+        self.project_completions = FuzzyIndex(
+            (name, name) for name in self.project_index.symbols()
+        )
+
+    def poll_project_index(self):
+        if self.project_index.poll():
+            self.update_project_completions()
+        self.win.after(PROJECT_INDEX_POLL_DELAY, self.poll_project_index)
 
     def get_context_suggestions(self, partial_word):
-        suggestions = []
-        content = self.text_editor.get(1.0, "end")
-
-        # Find class names
-        class_pattern = r"class\s+(\w+)"
-        classes = re.findall(class_pattern, content)
-        for cls in classes:
-            if cls.lower().startswith(partial_word.lower()):
-                suggestions.append(cls)
-
-        # Find function names
-        func_pattern = r"def\s+(\w+)"
-        functions = re.findall(func_pattern, content)
-        for func in functions:
-            if func.lower().startswith(partial_word.lower()):
-                suggestions.append(func)
-
-        # Find variable names (simple heuristic)
-        var_pattern = r"(\w+)\s*="
-        variables = re.findall(var_pattern, content)
-        for var in variables:
-            if (
-                var.lower().startswith(partial_word.lower())
-                and var not in self.python_keywords
-            ):
-                suggestions.append(var)
+        # Names visible at the cursor according to the last buffer text that
+        # parsed, or every name defined in the buffer until one does
+        line = int(self.text_editor.index(INSERT).split(".")[0])
+        names = self.scope_completion.names(partial_word, line)
+        if names is None:
+            names = self.buffer_symbols.names()
+        return names
+
+    def schedule_highlight(self):
+        if self.active.read_only:
+            return
+        self.scheduler.schedule(
+            "highlight", self.highlighter.highlight, HIGHLIGHT_PRIORITY
+        )
 
-        return suggestions
+    def schedule_parse(self):
+        if self.active.read_only:
+            return
+        self.scheduler.schedule("parse", self.parse_buffer, PARSE_PRIORITY, PARSE_DELAY)
+
+    def parse_buffer(self):
+        self.scope_completion.parse(self.text_editor.get(1.0, "end-1c"))
+        if self.scope_completion.running() and self.parse_poll_id is None:
+            self.parse_poll_id = self.win.after(PARSE_POLL_DELAY, self.poll_parse)
+
+    def poll_parse(self):
+        # Only the active buffer is polled, others pick up their parse when
+        # switched back to
+        self.parse_poll_id = None
+        if self.scope_completion.poll():
+            # The symbol table is only needed until the buffer first parses
+            self.buffer_symbols.pause()
+        if self.scope_completion.running():
+            self.parse_poll_id = self.win.after(PARSE_POLL_DELAY, self.poll_parse)
 
     def show_autocomplete(self, partial_word=None):
         if partial_word is None:
@@ -641,90 +1619,24 @@ class {class_name}:
             self.hide_autocomplete()
             return
 
-        self.autocomplete_suggestions = suggestions
-
-        # Create popup if it doesn't exist
-        if not self.autocomplete_popup:
-            self.autocomplete_popup = Toplevel(self.win)
-            self.autocomplete_popup.wm_overrideredirect(True)
-
-            self.autocomplete_listbox = Listbox(
-                self.autocomplete_popup,
-                height=min(8, len(suggestions)),
-                selectmode=SINGLE,
-                exportselection=False,
-            )
-            self.autocomplete_listbox.pack()
-
-            # Bind events
-            self.autocomplete_listbox.bind("<Double-Button-1>", self.insert_suggestion)
-            self.autocomplete_listbox.bind("<Return>", self.insert_suggestion)
-            self.autocomplete_popup.bind("<Escape>", self.hide_autocomplete)
-
-            self.style_manager.apply_to(self.autocomplete_popup)
-            self.style_manager.apply_to(self.autocomplete_listbox)
-
-            # Handle navigation keys
-            self.text_editor.bind("<Down>", self.navigate_suggestions)
-            self.text_editor.bind("<Up>", self.navigate_suggestions)
-            self.text_editor.bind("<Return>", self.handle_return)
-
-        # Clear and populate listbox
-        if self.autocomplete_listbox:
-            self.autocomplete_listbox.delete(0, "end")
-            for suggestion in suggestions:
-                self.autocomplete_listbox.insert("end", suggestion)
-
-            # Select first item
-            if suggestions:
-                self.autocomplete_listbox.selection_set(0)
-
-        # Position popup
-        self.position_autocomplete_popup()
-
-        # Apply styling
-        self.style_manager.apply_to(self.autocomplete_listbox)
-
-    def position_autocomplete_popup(self):
-        if not self.autocomplete_popup:
-            return
-
         # Get cursor position in text widget
-        cursor_pos = self.text_editor.index(INSERT)
-        bbox = self.text_editor.bbox(cursor_pos)
-
-        if bbox:
-            x, y, width, height = bbox
-            # Get text widget's position relative to root window
-            text_x = self.text_editor.winfo_rootx()
-            text_y = self.text_editor.winfo_rooty()
-
-            # Position popup below cursor
-            popup_x = text_x + x
-            popup_y = text_y + y + height + 5
+        bbox = self.text_editor.bbox(INSERT)
+        if not bbox:
+            self.hide_autocomplete()
+            return
 
-            self.autocomplete_popup.geometry(f"+{popup_x}+{popup_y}")
+        # Position popup below cursor
+        x, y, width, height = bbox
+        popup_x = self.text_editor.winfo_rootx() + x
+        popup_y = self.text_editor.winfo_rooty() + y + height + 5
+        self.autocomplete.show(suggestions, popup_x, popup_y)
 
     def navigate_suggestions(self, event):
-        if not self.autocomplete_popup or not self.autocomplete_listbox:
+        if not self.autocomplete.visible:
             return
 
-        current_selection = self.autocomplete_listbox.curselection()
-        if not current_selection:
-            return
-
-        current_index = current_selection[0]
-
-        if event.keysym == "Down":
-            new_index = min(current_index + 1, self.autocomplete_listbox.size() - 1)
-        else:  # Up
-            new_index = max(current_index - 1, 0)
-
-        self.autocomplete_listbox.selection_clear(0, "end")
-        self.autocomplete_listbox.selection_set(new_index)
-        self.autocomplete_listbox.see(new_index)
-
-        return "break"  # Prevent default newline behavior
+        # Prevent default cursor movement
+        return self.autocomplete.move(1 if event.keysym == "Down" else -1)
 
     def show_snippet_menu(self):
         if not self.code_snippets:
@@ -813,7 +1725,8 @@ class {class_name}:
 
     def compile(self):
         def confirm():
-            self.save_file()
+            self.save_all()
+            self.saver.wait()
             spec_path = os.path.join(self.directory, "game.spec")
 
             game_path = "game.py"
@@ -0,0 +1,67 @@
+import hashlib
+
+# Inactive tabs whose Text widget (with its undo history and highlighting) is
+# kept alive; older ones are dropped and rebuilt when switched back to
+MAX_RESIDENT_BUFFERS = 8
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.sha1(text.encode("utf-8", "surrogatepass")).digest()
+
+
+class EditorBuffer:
+    # An open file. While resident it owns a Text widget, which keeps the
+    # text, undo stack, highlighting tags and view, plus the highlighter and
+    # completion state that go with it.
+    def __init__(self, path: str):
+        self.path = path
+        self.text = None
+        self.highlighter = None
+        self.symbols = None
+        self.scope = None
+        self.tab = None
+        # Large files open read-only, without highlighting or completion,
+        # and are filled in by a ChunkedLoader
+        self.read_only = False
+        self.loader = None
+        # Hash of the text as last read or saved
+        self.saved_hash = None
+        # Order of last use, for dropping the least recently used
+        self.last_used = 0
+
+        # What a dropped buffer remembers: its unsaved text, if any, and
+        # where the cursor and view were
+        self.content = None
+        self.cursor = "1.0"
+        self.view = 0.0
+
+    def resident(self) -> bool:
+        return self.text is not None
+
+    def get_text(self) -> str:
+        if self.text is None:
+            return self.content
+        return self.text.get("1.0", "end-1c")
+
+    def modified(self) -> bool:
+        if self.read_only:
+            return False
+        if self.text is None:
+            return self.content is not None
+        return content_hash(self.get_text()) != self.saved_hash
+
+    def drop(self):
+        # Frees the widget and lexer state, keeping only what modified() and
+        # the next load need
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader = None
+        self.content = self.get_text() if self.modified() else None
+        self.cursor = self.text.index("insert")
+        self.view = self.text.yview()[0]
+        self.highlighter.close()
+        self.text.destroy()
+        self.text = None
+        self.highlighter = None
+        self.symbols = None
+        self.scope = None
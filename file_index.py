@@ -0,0 +1,147 @@
+import bisect
+import os
+import re
+import threading
+
+from completion_index import MAX_SUGGESTIONS, candidate, rank
+from project_index import SKIPPED_DIRS
+
+# Files quick-open offers
+OPEN_EXTENSIONS = (".py", ".json")
+
+# Template code that is not meant to be edited by hand
+HIDDEN_DIRS = {"scripts/built_in"}
+
+
+class FileIndex:
+    # Files of a project, listed per directory. A refresh stats every
+    # directory but only lists the ones whose mtime changed, so folders full
+    # of assets cost one stat each.
+    def __init__(self, directory: str, extensions=OPEN_EXTENSIONS):
+        self.directory = directory
+        self.extensions = extensions
+        # Relative path -> (mtime_ns, files, subdirectories)
+        self.dirs = {}
+        # (candidates, their casefolded paths joined by newlines, offset of
+        # each in that string), swapped in as a whole
+        self.search_data = ([], "", [])
+        self.lock = threading.Lock()
+
+    def refresh(self, blocking: bool = True) -> bool:
+        # True when files were added or removed. Unless `blocking`, returns
+        # False at once while another refresh runs.
+        if not self.lock.acquire(blocking=blocking):
+            return False
+        try:
+            dirs = {}
+            changed = False
+            pending = [""]
+            while pending:
+                relative = pending.pop()
+                path = os.path.join(self.directory, relative)
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                    entry = self.dirs.get(relative)
+                    if entry is None or entry[0] != mtime:
+                        entry = self.list_directory(relative, path, mtime)
+                        changed = True
+                except OSError:
+                    changed = True
+                    continue
+                dirs[relative] = entry
+                pending.extend(entry[2])
+            self.dirs = dirs
+            if changed:
+                self.build()
+            return changed
+        finally:
+            self.lock.release()
+
+    def list_directory(self, relative: str, path: str, mtime: int) -> tuple:
+        files = []
+        subdirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = f"{relative}/{entry.name}" if relative else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if (
+                        entry.name not in SKIPPED_DIRS
+                        and not entry.name.startswith(".")
+                        and name not in HIDDEN_DIRS
+                    ):
+                        subdirs.append(name)
+                elif entry.name.endswith(self.extensions):
+                    files.append(name)
+        return mtime, files, subdirs
+
+    def build(self):
+        # Shortest paths first, the order rank() picks within a tier, so a
+        # search can stop after `limit` hits per tier
+        files = sorted(
+            (name for entry in self.dirs.values() for name in entry[1]),
+            key=lambda name: (len(name), name),
+        )
+        candidates = [candidate(name, name) for name in files]
+        self.search_data = (
+            candidates,
+            lines(item[0] for item in candidates),
+            lines(item[2] for item in candidates),
+        )
+
+    def files(self) -> list:
+        return [item[3] for item in self.search_data[0]]
+
+    def search(self, query: str, limit: int = MAX_SUGGESTIONS) -> list:
+        candidates, paths, initials = self.search_data
+        folded = query.casefold()
+        if not folded:
+            return [item[3] for item in candidates[:limit]]
+
+        # The tiers of rank() found with regex searches over all paths at
+        # once: prefix matches, then initials, then any subsequence. Only
+        # the hits are ranked.
+        prefix = re.compile(re.escape("\n" + folded))
+        subsequence = re.compile(
+            re.escape(folded[0])
+            + "".join(
+                f"[^{re.escape(char)}\\n]*{re.escape(char)}" for char in folded[1:]
+            )
+        )
+        found = {}
+        find_lines(prefix, paths, limit, found)
+        find_lines(subsequence, initials, limit, found)
+        find_lines(subsequence, paths, limit, found)
+        matches = [candidates[index] for index in found]
+        return [word for _, word in rank(query, matches, limit)]
+
+
+def lines(texts) -> tuple:
+    # The texts joined into one string, each after a newline, and the
+    # offset of each newline
+    starts = []
+    offset = 0
+    parts = []
+    for text in texts:
+        starts.append(offset)
+        offset += len(text) + 1
+        parts.append(text)
+    return "\n" + "\n".join(parts), starts
+
+
+def find_lines(pattern, lines: tuple, limit: int, found: dict):
+    # Adds the indices of the first `limit` lines matching `pattern` that are
+    # not in `found` yet
+    text, starts = lines
+    pos = 0
+    added = 0
+    while added < limit:
+        match = pattern.search(text, pos)
+        if match is None:
+            return
+        index = bisect.bisect_right(starts, match.start()) - 1
+        if index not in found:
+            found[index] = None
+            added += 1
+        if index + 1 == len(starts):
+            return
+        pos = starts[index + 1]
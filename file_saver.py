@@ -0,0 +1,94 @@
+import os
+import queue
+import stat
+import tempfile
+import threading
+
+# New files get the permissions open() would have given them
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def write_atomic(path: str, text: str, fsync: bool = True, newline=None):
+    # Writes to a temporary file next to `path` and renames it over the
+    # original, so a crash leaves either the old or the new file, never a
+    # truncated one. With fsync the data (and the rename) reach the disk
+    # before this returns. `newline` is passed on to open().
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline=newline) as f:
+            f.write(text)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~UMASK
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if fsync and os.name != "nt":
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class FileSaver:
+    # Writes batches of files on a background thread. Results are collected
+    # from the main thread with poll().
+    def __init__(self, fsync: bool = True):
+        self.fsync = fsync
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.worker.start()
+
+    def save(self, files: list):
+        # files: (path, text, tag) tuples, written in order as one job. The
+        # tag comes back with the result.
+        self.pending += 1
+        self.jobs.put(files)
+
+    def work(self):
+        # Any error is reported with its file, the worker must outlive it or
+        # wait() never returns
+        while True:
+            files = self.jobs.get()
+            saved = []
+            try:
+                for path, text, tag in files:
+                    try:
+                        write_atomic(path, text, self.fsync)
+                        saved.append((path, tag, None))
+                    except Exception as e:
+                        saved.append((path, tag, e))
+            finally:
+                self.results.put(saved)
+                self.jobs.task_done()
+
+    def poll(self) -> list:
+        # (path, tag, error or None) of every file written since the last poll
+        done = []
+        while True:
+            try:
+                done.extend(self.results.get_nowait())
+            except queue.Empty:
+                return done
+            self.pending -= 1
+
+    def wait(self):
+        # Blocks until every queued batch is on disk
+        self.jobs.join()
@@ -0,0 +1,290 @@
+from pygments.lexer import RegexLexer
+from pygments.lexers import get_lexer_by_name
+from pygments.lexers.python import PythonLexer
+from pygments.token import Error, Whitespace, _TokenType
+
+from python_lexer import FastPythonLexer
+
+# Lexer state is remembered at the start of every Nth line
+CHECKPOINT_INTERVAL = 20
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def common_suffix_length(a: str, b: str, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid : len(a) - lo] == b[len(b) - mid : len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class HighlightEngine:
+    def __init__(
+        self,
+        language: str,
+        tags=None,
+        checkpoint_interval: int = CHECKPOINT_INTERVAL,
+        fast: bool = True,
+    ):
+        self.lexer = get_lexer_by_name(language)
+        # Python gets the built-in lexer, everything else goes through pygments
+        self.fast = fast and type(self.lexer) is PythonLexer
+        if self.fast:
+            self.scan = FastPythonLexer(self.regex_scan).scan
+        else:
+            self.scan = self.regex_scan
+        # Token types outside of `tags` are dropped, None keeps all of them
+        self.tags = None if tags is None else set(tags)
+        self.checkpoint_interval = checkpoint_interval
+        self.tag_names = {}
+        self.reset()
+
+    def reset(self):
+        self.text = ""
+        # line_tokens[i] is a list of (start_col, end_col, tag) for line i,
+        # states[i] is the lexer stack at the start of line i (or None)
+        self.line_tokens = [[]]
+        self.states = [("root",)]
+        # Lines before `lexed` have up to date tokens, lexing resumes from
+        # the character offset `lexed_offset`
+        self.lexed = 1
+        self.lexed_offset = 0
+        # (first, old_end, new_end) line range replaced by the last update,
+        # and the character offset of its first line
+        self.edit = None
+        self.edit_offset = 0
+
+    def snapshot(self) -> tuple:
+        return self.lexed, self.lexed_offset, self.line_tokens, self.states
+
+    def restore(self, text: str, state: tuple):
+        self.text = text
+        self.lexed, self.lexed_offset, self.line_tokens, self.states = state
+        self.edit = None
+
+    def regex_scan(
+        self,
+        text: str,
+        pos: int,
+        stack: tuple,
+        until_root: bool = False,
+        marked: int = -1,
+    ):
+        # Same loop as RegexLexer.get_tokens_unprocessed, but resumable from
+        # any (pos, stack) and reporting the stack whenever a match starts a
+        # line, so those lines can be used as restart points. With
+        # `until_root` it returns the position where the stack is back to
+        # ("root",), or None if the text ends first.
+        if not isinstance(self.lexer, RegexLexer):
+            if pos == 0:
+                yield from self.lexer.get_tokens_unprocessed(text)
+            return
+
+        tokendefs = self.lexer._tokens
+        statestack = list(stack)
+        statetokens = tokendefs[statestack[-1]]
+        while True:
+            if pos != marked and (pos == 0 or text[pos - 1] == "\n"):
+                marked = pos
+                yield pos, None, tuple(statestack)
+            for rexmatch, action, new_state in statetokens:
+                m = rexmatch(text, pos)
+                if m:
+                    if action is not None:
+                        if type(action) is _TokenType:
+                            yield pos, action, m.group()
+                        else:
+                            yield from action(self.lexer, m)
+                    pos = m.end()
+                    if new_state is not None:
+                        if isinstance(new_state, tuple):
+                            for state in new_state:
+                                if state == "#pop":
+                                    if len(statestack) > 1:
+                                        statestack.pop()
+                                elif state == "#push":
+                                    statestack.append(statestack[-1])
+                                else:
+                                    statestack.append(state)
+                        elif isinstance(new_state, int):
+                            if abs(new_state) >= len(statestack):
+                                del statestack[1:]
+                            else:
+                                del statestack[new_state:]
+                        elif new_state == "#push":
+                            statestack.append(statestack[-1])
+                        statetokens = tokendefs[statestack[-1]]
+                    break
+            else:
+                if pos >= len(text):
+                    break
+                if text[pos] == "\n":
+                    statestack = ["root"]
+                    statetokens = tokendefs["root"]
+                    yield pos, Whitespace, "\n"
+                else:
+                    yield pos, Error, text[pos]
+                pos += 1
+            if until_root and len(statestack) == 1:
+                return pos
+
+    def update(self, text: str, limit: int = None) -> list:
+        # Returns the line ranges that were (re)lexed. With a limit, lexing
+        # stops at the first restart point at or after that line.
+        changed = []
+        self.edit = None
+        old_text = self.text
+        if text != old_text:
+            self.text = text
+            changed.extend(self.edit_lines(old_text, text, limit))
+
+        line = self.lexed
+        if line < len(self.line_tokens) and (limit is None or line < limit):
+            stop = self.relex(
+                text, line, self.lexed_offset, len(self.line_tokens) + 1, limit
+            )
+            changed.append((line, stop))
+        return changed
+
+    def edit_lines(self, old_text: str, text: str, limit: int = None) -> list:
+        # Find the changed region as a range of lines
+        prefix = common_prefix_length(old_text, text)
+        suffix = common_suffix_length(
+            old_text, text, min(len(old_text), len(text)) - prefix
+        )
+        first = text.count("\n", 0, prefix)
+        old_end = len(self.line_tokens) - old_text.count("\n", len(old_text) - suffix)
+        new_end = (
+            old_end
+            + text.count("\n", prefix, len(text) - suffix)
+            - old_text.count("\n", prefix, len(old_text) - suffix)
+        )
+        self.edit = first, old_end, new_end
+        self.edit_offset = text.rfind("\n", 0, prefix) + 1
+
+        # Lines after the edit keep their old tokens and states until the
+        # lexer proves they are still valid
+        self.line_tokens[first:old_end] = [None] * (new_end - first)
+        self.states[first + 1 : old_end] = [None] * (new_end - first - 1)
+
+        if first >= self.lexed:
+            # Nothing lexed so far depends on the edited lines
+            return []
+        if self.lexed >= old_end:
+            self.lexed += new_end - old_end
+            self.lexed_offset += len(text) - len(old_text)
+        else:
+            self.lexed = -1
+
+        # Restart from the closest checkpoint above the edited line
+        line = max(first - 1, 0)
+        while self.states[line] is None:
+            line -= 1
+        offset = text.rfind("\n", 0, prefix) + 1
+        for _ in range(first - line):
+            offset = text.rfind("\n", 0, offset - 1) + 1
+
+        return [(line, self.relex(text, line, offset, new_end, limit))]
+
+    def relex(
+        self, text: str, line: int, offset: int, edit_end: int, limit: int = None
+    ) -> int:
+        line_tokens = self.line_tokens
+        states = self.states
+        tags = self.tags
+        tag_names = self.tag_names
+        interval = self.checkpoint_interval
+        lexed = self.lexed
+
+        line_start = offset
+        current = []
+        for pos, ttype, value in self.scan(text, offset, states[line]):
+            if ttype is None:
+                # value is the lexer stack at the start of this line
+                if edit_end <= line <= lexed and states[line] == value:
+                    # Token stream lines up with the old one again
+                    return line
+                if limit is not None and line >= limit:
+                    states[line] = value
+                    self.lexed = line
+                    self.lexed_offset = pos
+                    return line
+                if line % interval == 0:
+                    states[line] = value
+                elif line:
+                    states[line] = None
+                continue
+
+            tag = tag_names.get(ttype)
+            if tag is None:
+                tag = str(ttype)
+                if tags is not None and tag not in tags:
+                    tag = ""
+                tag_names[ttype] = tag
+
+            if "\n" not in value:
+                if tag:
+                    start = pos - line_start
+                    end = start + len(value)
+                    if current and current[-1][1] == start and current[-1][2] == tag:
+                        current[-1] = (current[-1][0], end, tag)
+                    else:
+                        current.append((start, end, tag))
+                continue
+
+            # Token spans several lines, split it up
+            pieces = value.split("\n")
+            last = len(pieces) - 2
+            for index, piece in enumerate(pieces[:-1]):
+                if piece and tag:
+                    start = pos - line_start
+                    current.append((start, start + len(piece), tag))
+                pos += len(piece) + 1
+                line_tokens[line] = current
+                line += 1
+                line_start = pos
+                current = []
+                if index < last or pieces[-1]:
+                    # No match starts on this line, drop its old checkpoint
+                    states[line] = None
+            if pieces[-1] and tag:
+                current.append((0, len(pieces[-1]), tag))
+
+        line_tokens[line] = current
+        self.lexed = line + 1
+        return line + 1
+
+    def spans(self, first: int = 0, last: int = None) -> list:
+        # (start, end, tag) character offsets for the lexed lines in range
+        if last is None or last > self.lexed:
+            last = self.lexed
+        text = self.text
+        offset = 0
+        for _ in range(first):
+            offset = text.index("\n", offset) + 1
+
+        spans = []
+        for tokens in self.line_tokens[first:last]:
+            for start, end, tag in tokens:
+                spans.append((offset + start, offset + end, tag))
+            offset = text.find("\n", offset) + 1
+        return spans
+
+
+def compute_spans(text: str, language: str = "python", tags=None) -> list:
+    engine = HighlightEngine(language, tags)
+    engine.update(text)
+    return engine.spans()
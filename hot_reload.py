@@ -0,0 +1,72 @@
+import json
+import socket
+
+# Project files whose saves are sent to the running game
+RELOADED_DIRS = ("scripts/custom/",)
+RELOADED_FILES = ("main.py",)
+
+# Environment variable telling the game's reload agent where to connect
+PORT_VARIABLE = "PYDOT_RELOAD_PORT"
+
+# Longest wait (seconds) for the game to take a message
+SEND_TIMEOUT = 0.5
+
+
+def module_name(relative: str):
+    # Module of a project file the game is told to reload, or None
+    if not relative.endswith(".py"):
+        return None
+    if relative not in RELOADED_FILES and not relative.startswith(RELOADED_DIRS):
+        return None
+    name = relative[:-3].replace("/", ".")
+    if name.endswith(".__init__"):
+        name = name[: -len(".__init__")]
+    return name
+
+
+class ReloadServer:
+    # Local socket the agent in game.py connects to while the game runs.
+    # Each message is a JSON line naming the modules to reload.
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.listener.setblocking(False)
+        self.port = self.listener.getsockname()[1]
+        self.conn = None
+
+    def poll(self):
+        # Accepts the game's connection once it is made
+        if self.conn is not None or self.listener is None:
+            return
+        try:
+            self.conn, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        except OSError as e:
+            print(f"Error accepting hot reload connection: {e}")
+            return
+        self.conn.settimeout(SEND_TIMEOUT)
+
+    def send(self, modules: list) -> bool:
+        # False when the game is not connected (an older game.py, or still
+        # starting) and so will not reload
+        self.poll()
+        if self.conn is None:
+            return False
+        message = json.dumps({"reload": modules}) + "\n"
+        try:
+            self.conn.sendall(message.encode())
+        except OSError as e:
+            print(f"Error sending hot reload: {e}")
+            self.conn.close()
+            self.conn = None
+            return False
+        return True
+
+    def close(self):
+        for sock in (self.conn, self.listener):
+            if sock is not None:
+                sock.close()
+        self.conn = None
+        self.listener = None
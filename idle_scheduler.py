@@ -0,0 +1,46 @@
+class IdleScheduler:
+    # Named jobs run when Tk has no events left to handle, one per idle pass
+    # and lowest priority number first, so typing is never queued behind
+    # them. Scheduling a name again replaces its pending job.
+    def __init__(self, widget):
+        self.widget = widget
+        self.timers = {}
+        self.ready = {}
+        self.idle_id = None
+
+    def schedule(self, name: str, callback, priority: int = 0, delay: int = 0):
+        # `delay` (ms) debounces the job: it only becomes ready once no newer
+        # job with the same name was scheduled for that long
+        self.cancel(name)
+        if delay:
+            self.timers[name] = self.widget.after(
+                delay, self.make_ready, name, callback, priority
+            )
+        else:
+            self.make_ready(name, callback, priority)
+
+    def make_ready(self, name: str, callback, priority: int):
+        self.timers.pop(name, None)
+        self.ready[name] = (priority, callback)
+        if self.idle_id is None:
+            self.idle_id = self.widget.after_idle(self.run)
+
+    def scheduled(self, name: str) -> bool:
+        return name in self.timers or name in self.ready
+
+    def cancel(self, name: str):
+        timer = self.timers.pop(name, None)
+        if timer is not None:
+            self.widget.after_cancel(timer)
+        self.ready.pop(name, None)
+
+    def run(self):
+        self.idle_id = None
+        if not self.ready:
+            return
+        name = min(self.ready, key=lambda name: self.ready[name][0])
+        _, callback = self.ready.pop(name)
+        # The rest wait for the next idle pass, after any new key events
+        if self.ready:
+            self.idle_id = self.widget.after_idle(self.run)
+        callback()
@@ -0,0 +1,71 @@
+import codecs
+import hashlib
+import io
+import mmap
+import os
+
+# Files bigger than this (bytes) open in the read-only view, loaded in chunks
+LARGE_FILE_SIZE = 2 * 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+
+# Milliseconds between chunks, so events are handled in between
+CHUNK_DELAY = 1
+
+
+class ChunkedLoader:
+    # Inserts a file into a Text widget one chunk per event loop turn,
+    # reading it through mmap. Newlines are translated like open() does, and
+    # the text is hashed the way content_hash() would hash it.
+    def __init__(self, text_widget, path: str, on_progress, on_done):
+        self.text_widget = text_widget
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")(), translate=True
+        )
+        self.digest = hashlib.sha1()
+        self.pos = 0
+
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map = None
+        if self.size:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.after_id = text_widget.after(CHUNK_DELAY, self.step)
+
+    def step(self):
+        end = min(self.pos + CHUNK_SIZE, self.size)
+        try:
+            chunk = self.decoder.decode(
+                self.map[self.pos : end] if self.map else b"", end == self.size
+            )
+        except UnicodeDecodeError as e:
+            print(f"Error reading file: {e}")
+            self.finish()
+            return
+        self.pos = end
+
+        self.digest.update(chunk.encode("utf-8", "surrogatepass"))
+        # The view stays read-only while loading
+        state = self.text_widget.cget("state")
+        self.text_widget.configure(state="normal")
+        self.text_widget.insert("end-1c", chunk)
+        self.text_widget.configure(state=state)
+        if self.pos < self.size:
+            self.on_progress(self.pos / self.size)
+            self.after_id = self.text_widget.after(CHUNK_DELAY, self.step)
+        else:
+            self.finish()
+
+    def finish(self):
+        self.cancel()
+        self.on_done(self.digest.digest())
+
+    def cancel(self):
+        if self.after_id is not None:
+            self.text_widget.after_cancel(self.after_id)
+            self.after_id = None
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
@@ -0,0 +1,130 @@
+import codecs
+import io
+from tkinter import *
+
+# Lines kept in the pane, older ones are dropped
+MAX_OUTPUT_LINES = 5000
+
+# Most bytes read from the game at once
+READ_SIZE = 64 * 1024
+
+
+def read_output(stream, chunks):
+    # Runs on the output thread. Puts everything the game wrote since the
+    # last read on the queue as one chunk, then None once the game closes
+    # its output. Newlines are translated like open() does.
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder("utf-8")("replace"), translate=True
+    )
+    while True:
+        try:
+            data = stream.read1(READ_SIZE)
+        except (OSError, ValueError):
+            data = b""
+        text = decoder.decode(data, not data)
+        if text:
+            chunks.put(text)
+        if not data:
+            stream.close()
+            chunks.put(None)
+            return
+
+
+class OutputPane:
+    # What the running game prints, below the editor or in its own window.
+    # `place` puts the frame back into the editor window.
+    def __init__(self, parent, style_manager, place, on_restart, on_stop):
+        self.parent = parent
+        self.place = place
+        self.docked = True
+        self.visible = False
+
+        self.frame = Frame(parent)
+        toolbar = Frame(self.frame)
+        self.status = Label(toolbar, text="Output", anchor="w")
+        restart_btn = Button(toolbar, text="Restart", command=on_restart)
+        stop_btn = Button(toolbar, text="Stop", command=on_stop)
+        clear_btn = Button(toolbar, text="Clear", command=self.clear)
+        self.dock_btn = Button(toolbar, text="Undock", command=self.toggle_dock)
+        hide_btn = Button(toolbar, text="Hide", command=self.hide)
+        self.text = Text(self.frame, height=12, wrap="char", state="disabled")
+        scrollbar = Scrollbar(self.frame, command=self.text.yview)
+        self.text.config(yscrollcommand=scrollbar.set)
+
+        for widget in (
+            self.frame,
+            toolbar,
+            self.status,
+            restart_btn,
+            stop_btn,
+            clear_btn,
+            self.dock_btn,
+            hide_btn,
+            self.text,
+        ):
+            style_manager.apply_to(widget)
+
+        self.status.pack(side="left", fill="x", expand=True)
+        hide_btn.pack(side="right", padx=2)
+        self.dock_btn.pack(side="right", padx=2)
+        clear_btn.pack(side="right", padx=2)
+        stop_btn.pack(side="right", padx=2)
+        restart_btn.pack(side="right", padx=2)
+        toolbar.pack(side="top", fill="x")
+        scrollbar.pack(side="right", fill="y")
+        self.text.pack(side="left", fill="both", expand=True)
+
+    def show(self):
+        if self.docked:
+            self.place(self.frame)
+        else:
+            self.parent.tk.call("wm", "deiconify", self.frame)
+        self.visible = True
+
+    def hide(self):
+        if self.docked:
+            self.frame.grid_remove()
+        else:
+            self.parent.tk.call("wm", "withdraw", self.frame)
+        self.visible = False
+
+    def toggle_dock(self):
+        # The frame itself becomes a top-level window and back
+        if self.docked:
+            self.frame.grid_forget()
+            self.parent.wm_manage(self.frame)
+            self.parent.tk.call("wm", "title", self.frame, "Output")
+            self.parent.tk.call(
+                "wm",
+                "protocol",
+                self.frame,
+                "WM_DELETE_WINDOW",
+                self.parent.register(self.toggle_dock),
+            )
+            self.dock_btn.config(text="Dock")
+        else:
+            self.parent.wm_forget(self.frame)
+            self.place(self.frame)
+            self.dock_btn.config(text="Undock")
+        self.docked = not self.docked
+        self.visible = True
+
+    def set_status(self, text: str):
+        self.status.config(text=text)
+
+    def write(self, text: str):
+        # Keeps following the end unless scrolled up
+        following = self.text.yview()[1] >= 1.0
+        self.text.configure(state="normal")
+        self.text.insert("end-1c", text)
+        lines = int(self.text.index("end-1c").split(".")[0])
+        if lines > MAX_OUTPUT_LINES:
+            self.text.delete("1.0", f"{lines - MAX_OUTPUT_LINES + 1}.0")
+        self.text.configure(state="disabled")
+        if following:
+            self.text.see("end")
+
+    def clear(self):
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.configure(state="disabled")
@@ -0,0 +1,185 @@
+import ast
+import hashlib
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+# Configuration paths
+if os.name == "nt":  # Windows
+    CONFIG_DIR = os.path.join(os.path.expanduser("~"), "pydot")
+else:  # Linux, macOS, etc.
+    CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".config", "pydot")
+
+INDEX_DIR = os.path.join(CONFIG_DIR, "project_index")
+
+# Bump when the symbols stored per file change shape
+INDEX_VERSION = 1
+
+SKIPPED_DIRS = {"__pycache__", "venv", "build", "dist"}
+
+
+def module_symbols(source: bytes, module: str) -> list:
+    # Completion entries a module offers to the rest of the project: the
+    # module itself, its top-level names and Class.member for every method,
+    # class attribute and self.attribute of its classes
+    tree = ast.parse(source)
+    names = {module}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            names.update(assigned_names(node))
+        elif isinstance(node, ast.ClassDef):
+            names.add(node.name)
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    names.add(f"{node.name}.{item.name}")
+                elif isinstance(item, (ast.Assign, ast.AnnAssign)):
+                    names.update(f"{node.name}.{name}" for name in assigned_names(item))
+            for child in ast.walk(node):
+                if (
+                    isinstance(child, ast.Attribute)
+                    and isinstance(child.ctx, ast.Store)
+                    and isinstance(child.value, ast.Name)
+                    and child.value.id == "self"
+                ):
+                    names.add(f"{node.name}.{child.attr}")
+    return sorted(names)
+
+
+def assigned_names(node) -> list:
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    names = []
+    for target in targets:
+        for child in ast.walk(target):
+            if isinstance(child, ast.Name):
+                names.append(child.id)
+    return names
+
+
+def project_files(directory: str) -> dict:
+    # Relative path -> os.stat_result of every .py file in the project
+    files = {}
+    pending = [directory]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if (
+                            entry.name not in SKIPPED_DIRS
+                            and not entry.name.startswith(".")
+                        ):
+                            pending.append(entry.path)
+                    elif entry.name.endswith(".py"):
+                        path = os.path.relpath(entry.path, directory)
+                        files[path.replace(os.sep, "/")] = entry.stat()
+        except OSError:
+            continue
+    return files
+
+
+def index_path(directory: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()
+    return os.path.join(INDEX_DIR, digest + ".pickle")
+
+
+def load_index(path: str) -> dict:
+    try:
+        with open(path, "rb") as f:
+            version, files = pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError, ValueError, TypeError):
+        return {}
+    return files if version == INDEX_VERSION else {}
+
+
+def update_index(directory: str) -> tuple:
+    # Runs in the indexing process. Files whose mtime and size are unchanged
+    # are not opened, ones whose contents hash the same are not parsed.
+    # Returns (files, number of files parsed).
+    path = index_path(directory)
+    old = load_index(path)
+    files = {}
+    parsed = 0
+    for name, stat in project_files(directory).items():
+        entry = old.get(name)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            files[name] = entry
+            continue
+        try:
+            with open(os.path.join(directory, name), "rb") as f:
+                source = f.read()
+        except OSError:
+            continue
+        digest = hashlib.sha1(source).hexdigest()
+        if entry is not None and entry[2] == digest:
+            symbols = entry[3]
+        else:
+            module = name[:-3].replace("/", ".")
+            if module.endswith(".__init__"):
+                module = module[: -len(".__init__")]
+            try:
+                symbols = module_symbols(source, module)
+                parsed += 1
+            except (SyntaxError, ValueError):
+                # Keep what the file offered before it broke
+                symbols = entry[3] if entry is not None else [module]
+        files[name] = (stat.st_mtime_ns, stat.st_size, digest, symbols)
+
+    if files != old:
+        try:
+            os.makedirs(INDEX_DIR, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                pickle.dump((INDEX_VERSION, files), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Error saving project index: {e}")
+    return files, parsed
+
+
+class ProjectIndex:
+    # Symbols of every module in a project, kept up to date by a separate
+    # process so parsing never blocks the editor
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.files = load_index(index_path(directory))
+        self.executor = None
+        self.future = None
+        self.pending = False
+
+    def symbols(self) -> set:
+        return {name for entry in self.files.values() for name in entry[3]}
+
+    def refresh(self):
+        if self.future is not None:
+            self.pending = True
+            return
+        if self.executor is None:
+            # A fresh interpreter rather than a fork of the Tk process
+            self.executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            )
+        self.future = self.executor.submit(update_index, self.directory)
+
+    def poll(self) -> bool:
+        # True when a refresh finished and the symbols changed
+        if self.future is None or not self.future.done():
+            return False
+        future, self.future = self.future, None
+        if self.pending:
+            self.pending = False
+            self.refresh()
+        try:
+            files, _ = future.result()
+        except Exception as e:
+            print(f"Error indexing project: {e}")
+            return False
+        changed = files != self.files
+        self.files = files
+        return changed
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,494 @@
+import difflib
+import hashlib
+import multiprocessing
+import os
+import pickle
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+from editor_buffer import content_hash
+from file_index import FileIndex
+from file_saver import write_atomic
+
+# Configuration paths
+if os.name == "nt":  # Windows
+    CONFIG_DIR = os.path.join(os.path.expanduser("~"), "pydot")
+else:  # Linux, macOS, etc.
+    CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".config", "pydot")
+
+INDEX_DIR = os.path.join(CONFIG_DIR, "search_index")
+
+# Bump when the trigrams stored per file change shape
+INDEX_VERSION = 2
+
+# Processes checking candidate files, and files each one gets at a time
+SEARCH_WORKERS = min(4, os.cpu_count() or 1)
+SEARCH_CHUNK = 32
+
+MAX_RESULTS = 2000
+# Longest line shown in a result
+MAX_LINE_LENGTH = 200
+# Longest diff shown per file in a replace preview
+MAX_DIFF_LINES = 200
+
+REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, "POSSESSIVE_REPEAT"):
+    REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+# Trigram indexes and file lists held by the index process, by project
+# directory
+INDEXES = {}
+FILE_INDEXES = {}
+
+
+def index_path(directory: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()
+    return os.path.join(INDEX_DIR, digest + ".pickle")
+
+
+def read_text(path: str) -> str:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+class Folding(dict):
+    # str.translate table sending each character to the one shared by every
+    # character re.IGNORECASE treats as equal to it ("s" for "S" and "ſ",
+    # "σ" for "Σ" and "ς"), one character for one so trigrams line up.
+    # Filled in as characters are met.
+    def __missing__(self, code: int) -> str:
+        folded = chr(code).lower()[:1].upper()[:1].lower()[:1]
+        self[code] = folded
+        return folded
+
+
+FOLDING = Folding()
+
+
+def fold(text: str) -> str:
+    return text.lower() if text.isascii() else text.translate(FOLDING)
+
+
+def trigrams(text: str) -> set:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def required_literals(pattern: str, flags: int) -> list:
+    # Strings every match of the regex contains. Alternations, classes and
+    # optional parts contribute nothing, so this may find fewer than exist
+    # but never one that a match could lack.
+    literals = []
+    collect_literals(sre_parse.parse(pattern, flags), literals)
+    return literals
+
+
+def collect_literals(items, literals: list):
+    run = []
+    for op, value in items:
+        if op == sre_constants.LITERAL:
+            run.append(chr(value))
+            continue
+        literals.append("".join(run))
+        run = []
+        if op == sre_constants.SUBPATTERN:
+            collect_literals(value[-1], literals)
+        elif op in REPEATS and value[0] >= 1:
+            collect_literals(value[2], literals)
+    literals.append("".join(run))
+
+
+def query_trigrams(literals: list) -> set:
+    # The index holds folded text, which also makes it usable for case
+    # sensitive searches
+    required = set()
+    for literal in literals:
+        required |= trigrams(fold(literal))
+    return required
+
+
+class TrigramIndex:
+    # Folded trigrams of every searched file, kept in the index process
+    # and on disk. Files whose mtime and size are unchanged are not read
+    # again.
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = index_path(directory)
+        # Relative path -> (mtime_ns, size, trigrams)
+        self.files = {}
+        try:
+            with open(self.path, "rb") as f:
+                version, files = pickle.load(f)
+            if version == INDEX_VERSION:
+                self.files = files
+        except (OSError, pickle.PickleError, EOFError, ValueError, TypeError):
+            pass
+        # Trigram -> relative paths of the files containing it
+        self.postings = {}
+        for name, entry in self.files.items():
+            self.add(name, entry[2])
+
+    def add(self, name: str, grams):
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(name)
+
+    def remove(self, name: str):
+        for gram in self.files.pop(name)[2]:
+            files = self.postings[gram]
+            files.discard(name)
+            if not files:
+                del self.postings[gram]
+
+    def update(self, names: list):
+        changed = False
+        for name in set(self.files) - set(names):
+            self.remove(name)
+            changed = True
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                entry = self.files.get(name)
+                if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                grams = frozenset(trigrams(fold(read_text(path))))
+            except OSError:
+                if name in self.files:
+                    self.remove(name)
+                    changed = True
+                continue
+            if name in self.files:
+                self.remove(name)
+            self.files[name] = (stat.st_mtime_ns, stat.st_size, grams)
+            self.add(name, grams)
+            changed = True
+        if changed:
+            self.save()
+
+    def save(self):
+        try:
+            os.makedirs(INDEX_DIR, exist_ok=True)
+            with open(self.path + ".tmp", "wb") as f:
+                pickle.dump((INDEX_VERSION, self.files), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            print(f"Error saving search index: {e}")
+
+    def candidates(self, required: set) -> list:
+        # Files containing every required trigram, rarest trigram first
+        if not required:
+            return sorted(self.files)
+        found = None
+        for gram in sorted(required, key=lambda gram: len(self.postings.get(gram, ()))):
+            files = self.postings.get(gram)
+            if not files:
+                return []
+            found = set(files) if found is None else found & files
+            if not found:
+                return []
+        return sorted(found)
+
+
+def plan_search(directory: str, required: set) -> list:
+    # Runs in the index process: lists the project's files again, brings
+    # the index up to date with them and returns the ones that can contain
+    # a match. Only directories whose mtime changed are listed again.
+    file_index = FILE_INDEXES.get(directory)
+    if file_index is None:
+        file_index = FILE_INDEXES[directory] = FileIndex(directory)
+    file_index.refresh()
+    index = INDEXES.get(directory)
+    if index is None:
+        index = INDEXES[directory] = TrigramIndex(directory)
+    index.update(file_index.files())
+    return index.candidates(required)
+
+
+def search_files(directory: str, names: list, pattern: str, flags: int) -> list:
+    # Runs in a search process: (path, line, column, end column, line text)
+    # of the first match starting on every line. Matches run over the whole
+    # text, so they can span lines; those end at the end of their first line.
+    compiled = re.compile(pattern, flags)
+    results = []
+    for name in names:
+        try:
+            text = read_text(os.path.join(directory, name))
+        except OSError:
+            continue
+        # Line `number` starts at `position`
+        number = 1
+        position = 0
+        reported = 0
+        for match in compiled.finditer(text):
+            start = match.start()
+            newlines = text.count("\n", position, start)
+            if newlines:
+                number += newlines
+                position = text.rfind("\n", position, start) + 1
+            if number == reported:
+                continue
+            reported = number
+            line_end = text.find("\n", start)
+            if line_end == -1:
+                line_end = len(text)
+            results.append(
+                (
+                    name,
+                    number,
+                    start - position,
+                    min(match.end(), line_end) - position,
+                    text[position:line_end][:MAX_LINE_LENGTH],
+                )
+            )
+            if len(results) >= MAX_RESULTS:
+                return results
+    return results
+
+
+def read_exact(path: str) -> str:
+    # The text as the editor reads it, but with line endings kept so a
+    # replace only changes what matched
+    with open(path, newline="") as f:
+        return f.read()
+
+
+def replacements(pattern: str, flags: int, template: str, text: str) -> list:
+    # (start, end, new text) of every replacement in `text`
+    return [
+        (match.start(), match.end(), match.expand(template))
+        for match in re.compile(pattern, flags).finditer(text)
+    ]
+
+
+def unified_diff(name: str, old: str, new: str) -> str:
+    lines = list(
+        difflib.unified_diff(
+            old.splitlines(keepends=True),
+            new.splitlines(keepends=True),
+            name,
+            name,
+            n=1,
+        )
+    )
+    if len(lines) > MAX_DIFF_LINES:
+        lines = lines[:MAX_DIFF_LINES] + [
+            f"... {len(lines) - MAX_DIFF_LINES} more lines\n"
+        ]
+    return "".join(line if line.endswith("\n") else line + "\n" for line in lines)
+
+
+def preview_files(
+    directory: str, names: list, pattern: str, flags: int, template: str
+) -> list:
+    # Runs in a search process: (path, replacements, digest, diff) of every
+    # file a replace would change. The digest lets the replace skip files
+    # that changed after the preview.
+    compiled = re.compile(pattern, flags)
+    results = []
+    for name in names:
+        try:
+            text = read_exact(os.path.join(directory, name))
+        except (OSError, UnicodeDecodeError):
+            continue
+        new, count = compiled.subn(template, text)
+        if count and new != text:
+            results.append(
+                (name, count, content_hash(text), unified_diff(name, text, new))
+            )
+    return results
+
+
+def replace_files(
+    directory: str,
+    files: list,
+    pattern: str,
+    flags: int,
+    template: str,
+    fsync: bool,
+) -> list:
+    # Runs in a search process: (path, replacements, error or None) of every
+    # file, each written atomically
+    compiled = re.compile(pattern, flags)
+    results = []
+    for name, digest in files:
+        path = os.path.join(directory, name)
+        try:
+            text = read_exact(path)
+            if content_hash(text) != digest:
+                results.append((name, 0, "changed since the preview"))
+                continue
+            new, count = compiled.subn(template, text)
+            write_atomic(path, new, fsync, newline="")
+            results.append((name, count, None))
+        except (OSError, UnicodeDecodeError) as e:
+            results.append((name, 0, str(e)))
+    return results
+
+
+class SearchPools:
+    # The index process and the search processes, shared by the searches of
+    # a project
+    def __init__(self):
+        self.index_executor = None
+        self.executor = None
+
+    def start(self):
+        # A fresh interpreter rather than a fork of the Tk process
+        context = multiprocessing.get_context("spawn")
+        if self.index_executor is None:
+            self.index_executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=SEARCH_WORKERS, mp_context=context
+            )
+
+    def close(self):
+        for executor in (self.index_executor, self.executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self.index_executor = None
+        self.executor = None
+
+
+class ProjectSearch:
+    # Find and replace in files. The trigram index narrows a query down to
+    # the files that can contain it, which are then searched in chunks by a
+    # pool of processes; results are collected with poll() as chunks finish.
+    def __init__(self, directory: str, pools: SearchPools):
+        self.directory = directory
+        self.pools = pools
+        self.plan = None
+        self.futures = []
+        # The running task, the arguments it gets after the files, and
+        # the most results it may return
+        self.task = None
+        self.args = ()
+        self.limit = None
+        self.skip = set()
+        self.count = 0
+        # Query of the last search or preview
+        self.pattern = None
+        self.flags = 0
+        self.template = None
+
+    def prepare(self):
+        # Brings the index up to date ahead of the first search
+        self.pools.start()
+        self.pools.index_executor.submit(plan_search, self.directory, set())
+
+    def search(self, query: str, regex: bool = False, case: bool = False):
+        # Raises re.error for an invalid regex
+        self.run(query, regex, case, None, search_files, MAX_RESULTS)
+
+    def preview(
+        self,
+        query: str,
+        replacement: str,
+        regex: bool = False,
+        case: bool = False,
+        skip=(),
+    ):
+        # Diffs of replacing every match, one result per changed file. Files
+        # in `skip` are left out. Raises re.error for an invalid regex or
+        # replacement.
+        template = replacement if regex else replacement.replace("\\", "\\\\")
+        self.run(query, regex, case, template, preview_files, None, skip)
+
+    def run(self, query, regex, case, template, task, limit, skip=()):
+        self.cancel()
+        pattern = query if regex else re.escape(query)
+        # ^ and $ match at every line, as they did when lines were searched
+        # one at a time
+        flags = re.MULTILINE if case else re.MULTILINE | re.IGNORECASE
+        compiled = re.compile(pattern, flags)
+        if template is not None:
+            compiled.sub(template, "")
+        literals = required_literals(pattern, flags) if regex else [query]
+
+        self.pools.start()
+        self.pattern = pattern
+        self.flags = flags
+        self.template = template
+        self.task = task
+        self.args = (pattern, flags) if template is None else (pattern, flags, template)
+        self.limit = limit
+        self.skip = set(skip)
+        self.count = 0
+        self.plan = self.pools.index_executor.submit(
+            plan_search, self.directory, query_trigrams(literals)
+        )
+
+    def replace(self, files: list, fsync: bool = True):
+        # Applies the last preview to `files`, (path, digest) pairs from its
+        # results. Results are (path, replacements, error or None).
+        self.cancel()
+        self.pools.start()
+        self.limit = None
+        self.count = 0
+        self.futures = [
+            self.pools.executor.submit(
+                replace_files,
+                self.directory,
+                files[i : i + SEARCH_CHUNK],
+                self.pattern,
+                self.flags,
+                self.template,
+                fsync,
+            )
+            for i in range(0, len(files), SEARCH_CHUNK)
+        ]
+
+    def running(self) -> bool:
+        return self.plan is not None or bool(self.futures)
+
+    def poll(self) -> list:
+        # Results of the chunks finished since the last poll, in file order
+        # within each chunk
+        results = []
+        if self.plan is not None and self.plan.done():
+            plan, self.plan = self.plan, None
+            try:
+                candidates = [name for name in plan.result() if name not in self.skip]
+            except Exception as e:
+                print(f"Error searching project: {e}")
+                candidates = []
+            self.futures = [
+                self.pools.executor.submit(
+                    self.task,
+                    self.directory,
+                    candidates[i : i + SEARCH_CHUNK],
+                    *self.args,
+                )
+                for i in range(0, len(candidates), SEARCH_CHUNK)
+            ]
+
+        pending = []
+        for future in self.futures:
+            if not future.done():
+                pending.append(future)
+                continue
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                print(f"Error searching project: {e}")
+        self.futures = pending
+
+        if self.limit is not None and self.count + len(results) >= self.limit:
+            results = results[: self.limit - self.count]
+            self.cancel()
+        self.count += len(results)
+        return results
+
+    def cancel(self):
+        # Chunks already being searched finish, but their results are dropped
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
+        if self.plan is not None:
+            self.plan.cancel()
+            self.plan = None
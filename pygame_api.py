@@ -0,0 +1,190 @@
+# Builds the pygame completion cache: python pygame_api.py
+import importlib
+import inspect
+import json
+import os
+import pickle
+import pkgutil
+from importlib import metadata
+
+from completion_index import candidate
+
+# Configuration paths
+if os.name == "nt":  # Windows
+    CONFIG_DIR = os.path.join(os.path.expanduser("~"), "pydot")
+else:  # Linux, macOS, etc.
+    CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".config", "pydot")
+
+API_FILE = os.path.join(CONFIG_DIR, "pygame_api.pickle")
+# Output of the last generation the editor started, and the pygame it was
+# for with the error it failed with, if it did. It is not started again for
+# the same pygame, a failure is reported once.
+LOG_FILE = os.path.join(CONFIG_DIR, "pygame_api.log")
+ATTEMPT_FILE = os.path.join(CONFIG_DIR, "pygame_api.attempt")
+
+# Bump when the cached symbols change shape
+API_VERSION = 1
+
+# Projects import pygame under this name
+ALIAS = "pydot"
+
+SKIPPED_MODULES = {"examples", "tests", "docs", "__pyinstaller", "__briefcase"}
+
+
+def installed_version():
+    # Version of the installed pygame distribution, without importing it
+    for distribution in ("pygame", "pygame-ce"):
+        try:
+            return distribution, metadata.version(distribution)
+        except metadata.PackageNotFoundError:
+            continue
+    return None
+
+
+def summary(obj) -> str:
+    doc = inspect.getdoc(obj)
+    return doc.strip().splitlines()[0] if doc and doc.strip() else ""
+
+
+def signature(name: str, obj) -> str:
+    # Python signatures where inspect finds one, otherwise the
+    # "name(args) -> result" line pygame's C functions start their docs with
+    try:
+        return name + str(inspect.signature(obj))
+    except (TypeError, ValueError):
+        pass
+    line = summary(obj)
+    short = name.rsplit(".", 1)[-1]
+    if line.startswith(short + "("):
+        return name + line[len(short) :]
+    return name + "(...)"
+
+
+def public_names(obj) -> list:
+    names = getattr(obj, "__all__", None)
+    if names is None:
+        names = dir(obj)
+    return [name for name in names if not name.startswith("_")]
+
+
+def pygame_modules() -> dict:
+    # Importable pygame modules by their name under ALIAS
+    pygame = importlib.import_module("pygame")
+    modules = {ALIAS: pygame}
+    for info in pkgutil.iter_modules(pygame.__path__):
+        if info.name.startswith("_") or info.name in SKIPPED_MODULES:
+            continue
+        try:
+            modules[f"{ALIAS}.{info.name}"] = importlib.import_module(
+                f"pygame.{info.name}"
+            )
+        except Exception as e:
+            print(f"Skipping pygame.{info.name}: {e}")
+    return modules
+
+
+def introspect() -> dict:
+    # Qualified name -> (kind, signature, first docstring line) of every
+    # module, class, method, function and constant pygame exposes
+    symbols = {}
+    modules = pygame_modules()
+    for module_name, module in modules.items():
+        symbols[module_name] = ("module", module_name, summary(module))
+        for name in public_names(module):
+            try:
+                value = getattr(module, name)
+            except AttributeError:
+                continue
+            qualified = f"{module_name}.{name}"
+            if inspect.ismodule(value):
+                continue
+            if inspect.isclass(value):
+                symbols[qualified] = (
+                    "class",
+                    signature(qualified, value),
+                    summary(value),
+                )
+                for member in public_names(value):
+                    attribute = inspect.getattr_static(value, member, None)
+                    if attribute is None:
+                        continue
+                    member_name = f"{qualified}.{member}"
+                    if callable(attribute) or inspect.ismethoddescriptor(attribute):
+                        method = getattr(value, member, attribute)
+                        symbols[member_name] = (
+                            "method",
+                            signature(member_name, method),
+                            summary(method),
+                        )
+                    else:
+                        symbols[member_name] = ("attribute", member_name, "")
+            elif callable(value):
+                symbols[qualified] = (
+                    "function",
+                    signature(qualified, value),
+                    summary(value),
+                )
+            elif isinstance(value, (int, float, str, bytes, tuple)):
+                symbols[qualified] = ("constant", f"{qualified} = {value!r}", "")
+    return symbols
+
+
+def generate(path: str = API_FILE) -> int:
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    symbols = introspect()
+    candidates = [candidate(name, name) for name in symbols]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(
+            (API_VERSION, installed_version(), symbols, candidates),
+            f,
+            pickle.HIGHEST_PROTOCOL,
+        )
+    os.replace(path + ".tmp", path)
+    # The editor may start a generation again if this cache goes missing
+    try:
+        os.remove(ATTEMPT_FILE)
+    except FileNotFoundError:
+        pass
+    return len(symbols)
+
+
+def load_api(path: str = API_FILE):
+    # (symbols, candidates) from the cache, or None if it is missing or was
+    # generated for another pygame or cache version
+    try:
+        with open(path, "rb") as f:
+            version, pygame_version, symbols, candidates = pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError, ValueError, TypeError):
+        return None
+    if version != API_VERSION or pygame_version != installed_version():
+        return None
+    return symbols, candidates
+
+
+def attempt_key() -> list:
+    return [API_VERSION, *installed_version()]
+
+
+def load_attempt():
+    try:
+        with open(ATTEMPT_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_attempt(error: str = None, reported: bool = False):
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    with open(ATTEMPT_FILE, "w") as f:
+        json.dump({"key": attempt_key(), "error": error, "reported": reported}, f)
+
+
+if __name__ == "__main__":
+    try:
+        count = generate()
+    except Exception as e:
+        # Read by the editor, which reports it once
+        save_attempt(f"{type(e).__name__}: {e}")
+        raise
+    print(f"Wrote {count} pygame symbols to {API_FILE}")
@@ -0,0 +1,362 @@
+import re
+
+from pygments.lexers.python import PythonLexer
+from pygments.token import (
+    Comment,
+    Error,
+    Keyword,
+    Name,
+    Number,
+    Operator,
+    Punctuation,
+    String,
+    Text,
+    Whitespace,
+)
+
+ROOT = ("root",)
+
+IDENTIFIER = r"[A-Za-z_][A-Za-z0-9_]*"
+
+TOKEN = re.compile(
+    rf"""
+    (?P<newline>\n)
+    |(?P<comment>\#[^\n]*)
+    |(?P<continuation>\\\n)
+    |(?P<backslash>\\)
+    |(?P<string>(?:[rR][bBfF]|[bBfF][rR]|[rRuUbBfF])?(?:'''|\"\"\"|'|"))
+    |(?P<space>[^\S\n]+)
+    |(?P<float>(?:\d(?:_?\d)*\.(?:\d(?:_?\d)*)?|(?:\d(?:_?\d)*)?\.\d(?:_?\d)*)
+        (?:[eE][+-]?\d(?:_?\d)*)?|\d(?:_?\d)*[eE][+-]?\d(?:_?\d)*j?)
+    |(?P<oct>0[oO](?:_?[0-7])+)
+    |(?P<bin>0[bB](?:_?[01])+)
+    |(?P<hex>0[xX](?:_?[a-fA-F0-9])+)
+    |(?P<integer>\d(?:_?\d)*)
+    |(?P<operator>!=|==|<<|>>|:=|[-~+/*%=<>&^|.])
+    |(?P<punctuation>[]{{}}:(),;[])
+    |(?P<name>{IDENTIFIER})
+    |(?P<decorator>@{IDENTIFIER})
+    |(?P<at>@)
+    |(?P<error>.)
+    """,
+    re.VERBOSE,
+)
+
+NAME = re.compile(IDENTIFIER)
+STATEMENT_SPACE = re.compile(r"(?:\s|\\\s)+")
+FROM_IMPORT = re.compile(
+    rf"(?P<keyword>(\s+)(import)\b)|(?P<dot>\.)|(?P<none>None\b)|(?P<name>{IDENTIFIER})"
+)
+IMPORT = re.compile(
+    rf"(?P<alias>(\s+)(as)(\s+))|(?P<dot>\.)|(?P<name>{IDENTIFIER})|(?P<comma>(\s*)(,)(\s*))"
+)
+YIELD_FROM = re.compile(r" from\b")
+
+NUMBERS = {
+    "float": Number.Float,
+    "oct": Number.Oct,
+    "bin": Number.Bin,
+    "hex": Number.Hex,
+    "integer": Number.Integer,
+}
+
+# Body of a string up to its closing quote, or a line break for the
+# single quoted ones
+STRING_END = {
+    quote: re.compile(
+        r"\\[\s\S]|" + re.escape(quote) + ("" if len(quote) == 3 else r"|\n")
+    )
+    for quote in ("'''", '"""', "'", '"')
+}
+# Characters that start String.Escape or String.Interpol tokens in a string
+STRING_SPECIAL = re.compile(r"[\\%{]")
+
+
+def rule_words(state: str):
+    # (word, token type, prefix) of the word lists in a PythonLexer state,
+    # so both lexers agree on them
+    for rule in PythonLexer.tokens[state]:
+        if hasattr(rule[0], "words"):
+            for word in rule[0].words:
+                yield word, rule[1], rule[0].prefix
+
+
+class FastPythonLexer:
+    # Tokenizes Python with a handful of combined regexes instead of trying
+    # PythonLexer's rules one by one. Token types and lexer stacks are the
+    # same as PythonLexer's, so f-strings, strings with escapes or
+    # formatting, soft keywords and non-ASCII text are handed to `fallback`,
+    # which scans from a (pos, stack) until the stack is back to ("root",)
+    # and returns where it stopped, or None once it reaches the end of the
+    # text.
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+        # Types of the words PythonLexer tries before plain names, lowest
+        # priority first. `unqualified` ones only count when not after a dot.
+        self.names = {}
+        self.unqualified = {}
+        for word in ("self", "Ellipsis", "NotImplemented", "cls"):
+            self.unqualified[word] = Name.Builtin.Pseudo
+        for state in ("magicvars", "magicfuncs", "builtins", "expr-keywords"):
+            for word, ttype, prefix in rule_words(state):
+                if prefix:
+                    self.names.pop(word, None)
+                    self.unqualified[word] = ttype
+                else:
+                    self.unqualified.pop(word, None)
+                    self.names[word] = ttype
+        for word in ("in", "is", "and", "or", "not"):
+            self.names[word] = Operator.Word
+        for word, ttype, prefix in rule_words("keywords"):
+            self.unqualified.pop(word, None)
+            self.names[word] = ttype
+        self.magic = {word for word, _, _ in rule_words("magicfuncs")}
+
+        root = PythonLexer.tokens["root"]
+        self.docstrings = [re.compile(rule[0], re.MULTILINE) for rule in root[1:3]]
+        self.soft_keyword = re.compile(
+            PythonLexer.tokens["soft-keywords"][0][0], re.MULTILINE
+        )
+
+        # Stacks of the string states, as PythonLexer reports them at the
+        # start of a continued line
+        self.string_states = {}
+        for prefix in ("", "b", "r"):
+            for quote in ("'''", '"""', "'", '"'):
+                opener = prefix + quote + ("\n" if len(quote) == 3 else "\\\n")
+                markers = [
+                    token[2]
+                    for token in fallback(opener, 0, ROOT)
+                    if token[1] is None and token[0] == len(opener)
+                ]
+                self.string_states[prefix, quote] = markers[0] if markers else None
+
+    def scan(self, text: str, pos: int, stack: tuple):
+        if not text.isascii():
+            yield from self.fallback(text, pos, stack)
+            return
+        marked = -1
+        if stack != ROOT:
+            marked = pos
+            pos = yield from self.fallback(text, pos, stack, True)
+            if pos is None:
+                return
+
+        fallback = self.fallback
+        match = TOKEN.match
+        names = self.names
+        unqualified = self.unqualified
+        length = len(text)
+        while pos < length:
+            if pos == 0 or text[pos - 1] == "\n":
+                if pos != marked:
+                    marked = pos
+                    yield pos, None, ROOT
+                if text[pos] != "\n":
+                    m = self.docstrings[0].match(text, pos) or self.docstrings[1].match(
+                        text, pos
+                    )
+                    if m:
+                        yield m.start(1), Whitespace, m.group(1)
+                        yield m.start(2), String.Affix, m.group(2)
+                        yield m.start(3), String.Doc, m.group(3)
+                        pos = m.end()
+                        continue
+                    if pos == 0 and text.startswith("#!") and length > 2:
+                        end = text.find("\n")
+                        if end == -1:
+                            end = length
+                        if end > 2:
+                            yield 0, Comment.Hashbang, text[:end]
+                            pos = end
+                            continue
+                    if self.soft_keyword.match(text, pos):
+                        pos = yield from fallback(text, pos, ROOT, True, marked)
+                        if pos is None:
+                            return
+                        continue
+
+            m = match(text, pos)
+            kind = m.lastgroup
+            value = m.group()
+            if kind == "name":
+                ttype = names.get(value)
+                if ttype is None:
+                    ttype = unqualified.get(value)
+                    if ttype is None or (pos and text[pos - 1] == "."):
+                        ttype = Name
+                if value in ("def", "class", "from", "import", "yield"):
+                    pos, marked = yield from self.statement(text, pos, value, marked)
+                    continue
+                yield pos, ttype, value
+            elif kind == "space":
+                yield pos, Text, value
+            elif kind == "operator":
+                yield pos, Operator, value
+            elif kind == "punctuation":
+                yield pos, Punctuation, value
+            elif kind == "newline":
+                yield pos, Whitespace, value
+            elif kind == "string":
+                quote = value.lstrip("rRuUbBfF")
+                prefix = value[: len(value) - len(quote)].lower()
+                if "f" in prefix:
+                    pos = yield from fallback(text, pos, ROOT, True, marked)
+                    if pos is None:
+                        return
+                    continue
+                pos, marked = yield from self.string(text, pos, prefix, quote, marked)
+                if pos is None:
+                    return
+                continue
+            elif kind in NUMBERS:
+                yield pos, NUMBERS[kind], value
+            elif kind == "comment":
+                yield pos, Comment.Single, value
+            elif kind == "decorator":
+                yield pos, Name.Decorator, value
+            elif kind == "at":
+                yield pos, Operator, value
+            elif kind == "error":
+                yield pos, Error, value
+            else:
+                yield pos, Text, value
+            pos = m.end()
+        if pos != marked and (pos == 0 or text[pos - 1] == "\n"):
+            yield pos, None, ROOT
+
+    def string(self, text: str, pos: int, prefix: str, quote: str, marked: int):
+        start = pos + len(prefix)
+        if quote[0] == '"':
+            ttype = String.Double
+        else:
+            ttype = String.Single
+
+        raw = "r" in prefix
+        if raw and len(quote) == 3:
+            # Backslashes escape nothing in raw triple quoted strings
+            end = text.find(quote, start + 3)
+            end = len(text) if end == -1 else end + 3
+        else:
+            finder = STRING_END[quote].search
+            m = finder(text, start + len(quote))
+            while m and m.group()[0] == "\\":
+                m = finder(text, m.end())
+            if m is None:
+                end = len(text)
+            elif m.group() == "\n":
+                end = m.start()
+            else:
+                end = m.end()
+
+        # Strings with escapes or % and {} formatting are split up the way
+        # PythonLexer does it
+        if STRING_SPECIAL.search(text, start + len(quote), end):
+            pos = yield from self.fallback(text, pos, ROOT, True, marked)
+            return pos, marked
+
+        if prefix:
+            yield pos, String.Affix, text[pos:start]
+        state = self.string_states["r" if raw else "b" if "b" in prefix else "", quote]
+        marked = -1
+        newline = text.find("\n", start, end)
+        while newline != -1:
+            yield start, ttype, text[start : newline + 1]
+            start = marked = newline + 1
+            if state is not None:
+                yield start, None, state
+            newline = text.find("\n", start, end)
+        if start < end:
+            yield start, ttype, text[start:end]
+        return end, marked
+
+    def statement(self, text: str, pos: int, word: str, marked: int):
+        end = pos + len(word)
+        if word == "yield":
+            m = YIELD_FROM.match(text, end)
+            if m:
+                end = m.end()
+            yield pos, Keyword, text[pos:end]
+            return end, marked
+
+        m = STATEMENT_SPACE.match(text, end)
+        if m is None:
+            yield pos, Name, word
+            return end, marked
+        if word in ("from", "import"):
+            yield pos, Keyword.Namespace, word
+        else:
+            yield pos, Keyword, word
+        yield end, Whitespace, m.group()
+        pos = m.end()
+
+        stack = ROOT + (
+            {
+                "def": "funcname",
+                "class": "classname",
+                "from": "fromimport",
+                "import": "import",
+            }[word],
+        )
+        while pos < len(text):
+            if pos != marked and text[pos - 1] == "\n":
+                marked = pos
+                yield pos, None, stack
+
+            if word == "def":
+                m = NAME.match(text, pos)
+                if m:
+                    if m.group() in self.magic:
+                        yield pos, Name.Function.Magic, m.group()
+                    else:
+                        yield pos, Name.Function, m.group()
+                    pos = m.end()
+                break
+
+            if word == "class":
+                m = NAME.match(text, pos)
+                if m:
+                    yield pos, Name.Class, m.group()
+                    pos = m.end()
+                    break
+                if text[pos] == "\n":
+                    break
+                yield pos, Error, text[pos]
+                pos += 1
+                continue
+
+            if word == "from":
+                m = FROM_IMPORT.match(text, pos)
+                if m is None:
+                    break
+                kind = m.lastgroup
+                if kind == "keyword":
+                    yield pos, Whitespace, m.group(2)
+                    yield m.start(3), Keyword.Namespace, m.group(3)
+                    pos = m.end()
+                    break
+                if kind == "none":
+                    yield pos, Keyword.Constant, m.group()
+                    pos = m.end()
+                    break
+                yield pos, Name.Namespace, m.group()
+                pos = m.end()
+                continue
+
+            m = IMPORT.match(text, pos)
+            if m is None:
+                break
+            kind = m.lastgroup
+            if kind == "alias":
+                yield pos, Whitespace, m.group(2)
+                yield m.start(3), Keyword, m.group(3)
+                yield m.start(4), Whitespace, m.group(4)
+            elif kind == "comma":
+                yield pos, Whitespace, m.group(8)
+                yield m.start(9), Operator, m.group(9)
+                yield m.start(10), Whitespace, m.group(10)
+            else:
+                yield pos, Name.Namespace, m.group()
+            pos = m.end()
+        return pos, marked
@@ -0,0 +1,224 @@
+import ast
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Buffers bigger than this are left to the plain symbol table
+MAX_PARSE_SIZE = 1024 * 1024
+
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+COMPREHENSION_NODES = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+# Nodes binding the name in their `name` or `rest` field (match statements
+# need Python 3.10)
+NAMED_NODES = (ast.ExceptHandler,) + tuple(
+    getattr(ast, name)
+    for name in ("MatchAs", "MatchStar", "MatchMapping")
+    if hasattr(ast, name)
+)
+
+
+class Scope:
+    def __init__(self, kind: str, node, parent=None):
+        self.kind = kind
+        self.name = getattr(node, "name", "")
+        self.start = getattr(node, "lineno", 1)
+        self.end = getattr(node, "end_lineno", None)
+        self.parent = parent
+        self.children = []
+        self.names = set()
+        # For classes, self.<name> assignments made in their methods and the
+        # names of base classes
+        self.attributes = set()
+        self.bases = []
+        if parent is not None:
+            parent.children.append(self)
+
+
+def visit(node, scope: Scope, classes: dict):
+    # Adds the names `node` binds to `scope`, opening new scopes for the
+    # classes and functions in it
+    if isinstance(node, ast.ClassDef):
+        scope.names.add(node.name)
+        for expression in node.bases + node.keywords + node.decorator_list:
+            visit(expression, scope, classes)
+        inner = Scope("class", node, scope)
+        inner.bases = [base.id for base in node.bases if isinstance(base, ast.Name)]
+        classes.setdefault(node.name, inner)
+        for statement in node.body:
+            visit(statement, inner, classes)
+        for child in ast.walk(node):
+            if (
+                isinstance(child, ast.Attribute)
+                and isinstance(child.ctx, ast.Store)
+                and isinstance(child.value, ast.Name)
+                and child.value.id == "self"
+            ):
+                inner.attributes.add(child.attr)
+        return
+
+    if isinstance(node, FUNCTION_NODES):
+        arguments = node.args
+        for expression in arguments.defaults + arguments.kw_defaults:
+            if expression is not None:
+                visit(expression, scope, classes)
+        inner = Scope("function", node, scope)
+        for argument in (
+            arguments.posonlyargs
+            + arguments.args
+            + arguments.kwonlyargs
+            + [arguments.vararg, arguments.kwarg]
+        ):
+            if argument is not None:
+                inner.names.add(argument.arg)
+        if isinstance(node, ast.Lambda):
+            visit(node.body, inner, classes)
+            return
+        scope.names.add(node.name)
+        for expression in node.decorator_list:
+            visit(expression, scope, classes)
+        for statement in node.body:
+            visit(statement, inner, classes)
+        return
+
+    if isinstance(node, COMPREHENSION_NODES):
+        # Their variables do not leak into the enclosing scope
+        return
+    if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+        scope.names.add(node.id)
+    elif isinstance(node, (ast.Import, ast.ImportFrom)):
+        for alias in node.names:
+            if alias.name != "*":
+                scope.names.add(alias.asname or alias.name.split(".")[0])
+    elif isinstance(node, NAMED_NODES):
+        name = getattr(node, "name", None) or getattr(node, "rest", None)
+        if name:
+            scope.names.add(name)
+    for child in ast.iter_child_nodes(node):
+        visit(child, scope, classes)
+
+
+def build_scopes(text: str):
+    # Runs in the parse process: (module scope, classes by name), or None
+    # if the text did not parse
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+
+    module = Scope("module", tree)
+    classes = {}
+    for statement in tree.body:
+        visit(statement, module, classes)
+    return module, classes
+
+
+class ParsePool:
+    # The process buffers are parsed in, shared by the buffers of an editor
+    def __init__(self):
+        self.executor = None
+
+    def submit(self, text: str):
+        if self.executor is None:
+            # A fresh interpreter rather than a fork of the Tk process
+            self.executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.executor.submit(build_scopes, text)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+class ScopeCompletion:
+    # Names visible at a line of the buffer, from the last buffer text that
+    # parsed. The tree is only rebuilt when parse() gets new text, in the
+    # parse process, and swapped in by poll().
+    def __init__(self, pool: ParsePool):
+        self.pool = pool
+        self.future = None
+        self.pending = None
+        self.reset()
+
+    def reset(self):
+        self.text = None
+        self.module = None
+        self.classes = {}
+
+    def parse(self, text: str):
+        # Text given while a parse runs waits for it, replacing any older
+        # text still waiting
+        if text == self.text or len(text) > MAX_PARSE_SIZE:
+            return
+        self.text = text
+        if self.future is not None:
+            self.pending = text
+            return
+        self.future = self.pool.submit(text)
+
+    def running(self) -> bool:
+        return self.future is not None
+
+    def poll(self) -> bool:
+        # True when a new tree was swapped in. If the text did not parse,
+        # the previous tree stays in use.
+        if self.future is None or not self.future.done():
+            return False
+        future, self.future = self.future, None
+        if self.pending is not None:
+            self.future = self.pool.submit(self.pending)
+            self.pending = None
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Error parsing buffer: {e}")
+            return False
+        if result is None:
+            return False
+        self.module, self.classes = result
+        return True
+
+    def scope_chain(self, line: int) -> list:
+        chain = [self.module]
+        while True:
+            for child in chain[-1].children:
+                if child.start <= line <= child.end:
+                    chain.append(child)
+                    break
+            else:
+                return chain
+
+    def visible_names(self, line: int) -> set:
+        chain = self.scope_chain(line)
+        names = set()
+        for scope in chain:
+            # Class bodies are not visible from the methods inside them
+            if scope.kind != "class" or scope is chain[-1]:
+                names |= scope.names
+        return names
+
+    def class_attributes(self, scope: Scope, seen=None) -> set:
+        # Members of a class, including those of its bases defined in the
+        # same buffer
+        seen = set() if seen is None else seen
+        seen.add(scope.name)
+        names = scope.names | scope.attributes
+        for base in scope.bases:
+            if base in self.classes and base not in seen:
+                names |= self.class_attributes(self.classes[base], seen)
+        return names
+
+    def names(self, word: str, line: int):
+        # Candidates for completing `word` at `line`: self.<member> of the
+        # enclosing class for "self." words, otherwise the visible names.
+        # None when nothing parsed yet.
+        if self.module is None:
+            return None
+        if word.startswith("self."):
+            classes = [
+                scope for scope in self.scope_chain(line) if scope.kind == "class"
+            ]
+            if not classes:
+                return []
+            return [f"self.{name}" for name in self.class_attributes(classes[-1])]
+        return list(self.visible_names(line))
@@ -1,6 +1,159 @@
+import importlib
+import inspect
+import json
+import os
+import socket
+import sys
+import traceback
+
 import pygame as pydot
 import main as m
 
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ReloadAgent:
+    # Reloads the modules Pydot saves while the game runs, between frames.
+    # Does nothing unless the game was started from the editor.
+    def __init__(self):
+        self.conn = None
+        self.data = b""
+        port = os.environ.get("PYDOT_RELOAD_PORT")
+        if port:
+            try:
+                self.conn = socket.create_connection(("127.0.0.1", int(port)), 1)
+                self.conn.setblocking(False)
+            except (OSError, ValueError):
+                self.conn = None
+
+    def poll(self):
+        if self.conn is None:
+            return
+        try:
+            data = self.conn.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.conn.close()
+            self.conn = None
+            return
+
+        self.data += data
+        *lines, self.data = self.data.split(b"\n")
+        names = []
+        for line in lines:
+            try:
+                names += json.loads(line)["reload"]
+            except (ValueError, KeyError, TypeError):
+                continue
+        if names:
+            reload_modules(names)
+
+
+def project_module(module) -> bool:
+    path = getattr(module, "__file__", None)
+    return (
+        path is not None
+        and module.__name__ != "__main__"
+        and os.path.abspath(path).startswith(PROJECT_DIR + os.sep)
+    )
+
+
+def uses(module, value, names: set) -> bool:
+    # Packages only hold their submodules, they need no reload for them
+    if inspect.ismodule(value):
+        return value.__name__ in names and not value.__name__.startswith(
+            module.__name__ + "."
+        )
+    if inspect.isclass(value) or inspect.isfunction(value):
+        return value.__module__ in names
+    return False
+
+
+def keeps_state(value) -> bool:
+    # Lists, dicts and objects hold the game's state and survive a reload,
+    # code and constants come from the new source
+    return not (
+        inspect.ismodule(value)
+        or inspect.isclass(value)
+        or inspect.isroutine(value)
+        or isinstance(value, (int, float, complex, str, bytes, tuple, frozenset))
+        or value is None
+    )
+
+
+def reload_modules(names: list):
+    modules = []
+    for name in dict.fromkeys(names):
+        module = sys.modules.get(name)
+        if module is not None and project_module(module):
+            modules.append(module)
+
+    # Modules that imported names from a reloaded one are reloaded after it
+    reloaded = {module.__name__ for module in modules}
+    changed = bool(modules)
+    while changed:
+        changed = False
+        for module in list(sys.modules.values()):
+            if (
+                module is None
+                or module.__name__ in reloaded
+                or not project_module(module)
+            ):
+                continue
+            if any(
+                uses(module, value, reloaded) for value in list(vars(module).values())
+            ):
+                modules.append(module)
+                reloaded.add(module.__name__)
+                changed = True
+
+    done = [module for module in modules if reload_module(module)]
+    update_classes(done)
+
+
+def reload_module(module) -> bool:
+    old = dict(vars(module))
+    try:
+        importlib.reload(module)
+    except Exception:
+        traceback.print_exc()
+        vars(module).clear()
+        vars(module).update(old)
+        print(f"[pydot] Could not reload {module.__name__}, kept the old code")
+        return False
+    for name, value in old.items():
+        if not name.startswith("__") and name in vars(module) and keeps_state(value):
+            vars(module)[name] = value
+    print(f"[pydot] Reloaded {module.__name__}")
+    return True
+
+
+def update_classes(modules: list):
+    # Objects kept from before the reload take on the new version of their
+    # class, so changed methods apply to them. Looks at module globals and
+    # one level into their lists, sets and dicts.
+    reloaded = {module.__name__: module for module in modules}
+    for module in list(sys.modules.values()):
+        if module is None or not project_module(module):
+            continue
+        for value in list(vars(module).values()):
+            objects = [value]
+            if isinstance(value, dict):
+                objects += list(value.values())
+            elif isinstance(value, (list, set)):
+                objects += list(value)
+            for obj in objects:
+                cls = type(obj)
+                new = getattr(reloaded.get(cls.__module__), cls.__name__, None)
+                if inspect.isclass(new) and new is not cls:
+                    try:
+                        obj.__class__ = new
+                    except TypeError:
+                        pass
+
 
 def main():
     pydot.init()
@@ -12,9 +165,13 @@ def main():
         screen = pydot.display.set_mode(m.resolution)
     pydot.display.set_caption(m.name)
     clock = pydot.time.Clock()
+    reload_agent = ReloadAgent()
 
     running = True
     while running:
+        # Code saved in the editor takes effect here, the window stays open
+        reload_agent.poll()
+
         for event in pydot.event.get():
             if event.type == pydot.QUIT:
                 running = False
@@ -1,14 +1,67 @@
+import queue
+import threading
 import tkinter
-from pygments import lex
-from pygments.lexers import get_lexer_by_name
+
+from highlight_engine import HighlightEngine
+from token_cache import TokenCache
+
+# Milliseconds to wait for typing to pause before lexing, and between checks
+# for finished lexing jobs
+HIGHLIGHT_DELAY = 30
+POLL_DELAY = 10
+
+# Buffers longer than this only get the visible lines (plus a margin) lexed
+# and tagged, the rest is filled in while scrolling
+VIEWPORT_THRESHOLD = 5000
+VIEWPORT_MARGIN = 100
+
+
+def unsynced_runs(synced: list, start: int, stop: int) -> list:
+    runs = []
+    while start < stop:
+        try:
+            start = synced.index(False, start, stop)
+        except ValueError:
+            break
+        try:
+            end = synced.index(True, start, stop)
+        except ValueError:
+            end = stop
+        runs.append((start, end))
+        start = end
+    return runs
 
 
 class SyntaxHighlighter:
-    def __init__(self, text_widget: tkinter.Text, language: str, theme: dict):
+    def __init__(
+        self, text_widget: tkinter.Text, language: str, theme: dict, symbols=None
+    ):
         self.text_widget = text_widget
         self.theme = theme
-        self.lexer = get_lexer_by_name(language)
+        # BufferSymbols kept up to date with the lexed text, if any
+        self.symbols = symbols
         self.setup_tags()
+        self.engine = HighlightEngine(language, self.tags)
+        self.cache = TokenCache()
+
+        # Main thread state
+        self.version = 0
+        self.busy = False
+        self.resubmit = False
+        self.needs_reset = False
+        self.after_id = None
+        self.poll_id = None
+
+        # painted[i] holds the tokens currently tagged on line i (None if the
+        # line was edited and its tags are unknown), synced[i] is True when
+        # those match the lexer. Only touched by the worker or while it is idle
+        self.painted = [[]]
+        self.synced = [False]
+
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.worker.start()
 
     def setup_tags(self):
         # Get syntax colors from theme, with fallbacks to accent colors
@@ -110,19 +163,166 @@ class SyntaxHighlighter:
             foreground=syntax.get("variable", self.theme.get("text_primary")),
         )
 
+        self.tags = [
+            tag for tag in self.text_widget.tag_names() if tag.startswith("Token.")
+        ]
+
+    def reset(self):
+        # Call after replacing the whole buffer, the old tags are gone
+        self.needs_reset = True
+
     def highlight(self, event=None):
-        content = self.text_widget.get("1.0", "end-1c")
-
-        # Clear all previous tags
-        for tag in self.text_widget.tag_names():
-            if tag.startswith("Token."):
-                self.text_widget.tag_remove(tag, "1.0", "end")
-
-        # Tokenize and apply new tags
-        start_index = "1.0"
-        for ttype, tvalue in lex(content, self.lexer):
-            end_index = f"{start_index}+{len(tvalue)}c"
-            tag_name = str(ttype)
-            if tag_name in self.text_widget.tag_names():
-                self.text_widget.tag_add(tag_name, start_index, end_index)
-            start_index = end_index
+        # Lexing happens on the worker thread once typing pauses
+        if self.after_id is not None:
+            self.text_widget.after_cancel(self.after_id)
+        self.after_id = self.text_widget.after(HIGHLIGHT_DELAY, self.submit)
+
+    def submit(self):
+        self.after_id = None
+        if self.busy:
+            self.resubmit = True
+            return
+
+        # Unmodified buffers are not copied again, e.g. when only scrolling
+        content = None
+        if self.needs_reset or self.text_widget.edit_modified():
+            content = self.text_widget.get("1.0", "end-1c")
+
+        self.busy = True
+        self.version += 1
+        self.text_widget.edit_modified(False)
+        self.jobs.put((self.version, content, self.needs_reset, self.visible_lines()))
+        self.needs_reset = False
+        self.poll_id = self.text_widget.after(POLL_DELAY, self.poll)
+
+    def visible_lines(self):
+        lines = int(self.text_widget.index("end-1c").split(".")[0])
+        if lines <= VIEWPORT_THRESHOLD:
+            return None
+
+        top = self.text_widget.index("@0,0")
+        bottom = self.text_widget.index(f"@0,{self.text_widget.winfo_height()}")
+        return (
+            max(int(top.split(".")[0]) - 1 - VIEWPORT_MARGIN, 0),
+            int(bottom.split(".")[0]) + VIEWPORT_MARGIN,
+        )
+
+    def close(self):
+        # Stops the worker, before the text widget is destroyed
+        for after_id in (self.after_id, self.poll_id):
+            if after_id is not None:
+                self.text_widget.after_cancel(after_id)
+        self.after_id = self.poll_id = None
+        self.jobs.put(None)
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            version, content, reset, window = job
+            store = False
+            if reset:
+                # A freshly loaded buffer has no tags at all
+                self.engine.reset()
+                store = not self.cache.load(self.engine, content)
+                self.painted = [[]] * len(self.engine.line_tokens)
+                self.synced = [False] * len(self.engine.line_tokens)
+            if content is None:
+                content = self.engine.text
+
+            changed = self.engine.update(content, window and window[1])
+            if self.engine.edit is not None:
+                # Tk moves tags along with the text, except on edited lines
+                first, old_end, new_end = self.engine.edit
+                self.painted[first:old_end] = [None] * (new_end - first)
+                self.synced[first:old_end] = [False] * (new_end - first)
+            for start, stop in changed:
+                self.synced[start:stop] = [False] * (stop - start)
+            if self.symbols is not None:
+                if reset:
+                    self.symbols.reset(content)
+                elif self.engine.edit is not None:
+                    self.symbols.update(
+                        content, *self.engine.edit, self.engine.edit_offset
+                    )
+
+            start, stop = window or (0, len(self.synced))
+            runs = []
+            for first, last in unsynced_runs(
+                self.synced, start, min(stop, self.engine.lexed)
+            ):
+                runs.append((first, last, self.engine.line_tokens[first:last]))
+            self.results.put((version, runs) + self.diff(runs))
+
+            if store:
+                self.cache.store(self.engine)
+
+    def diff(self, runs: list):
+        # Works out the tag changes between what is painted and what was lexed,
+        # as index lists per tag for a single "tag remove"/"tag add" call each
+        removes = {}
+        adds = {}
+        painted = self.painted
+        cleared = []
+        for first, last, line_tokens in runs:
+            for line, tokens in enumerate(line_tokens, first):
+                old = painted[line]
+                if old is None:
+                    if cleared and cleared[-1][1] == line:
+                        cleared[-1][1] = line + 1
+                    else:
+                        cleared.append([line, line + 1])
+                    added = tokens
+                elif old == tokens:
+                    continue
+                else:
+                    kept = set(tokens)
+                    for start, end, tag in old:
+                        if (start, end, tag) not in kept:
+                            removes.setdefault(tag, []).extend(
+                                (f"{line + 1}.{start}", f"{line + 1}.{end}")
+                            )
+                    kept = set(old)
+                    added = [token for token in tokens if token not in kept]
+
+                for start, end, tag in added:
+                    adds.setdefault(tag, []).extend(
+                        (f"{line + 1}.{start}", f"{line + 1}.{end}")
+                    )
+
+        for first, last in cleared:
+            for tag in self.tags:
+                removes.setdefault(tag, []).extend((f"{first + 1}.0", f"{last + 1}.0"))
+        return removes, adds
+
+    def poll(self):
+        try:
+            version, runs, removes, adds = self.results.get_nowait()
+        except queue.Empty:
+            self.poll_id = self.text_widget.after(POLL_DELAY, self.poll)
+            return
+
+        self.poll_id = None
+        self.busy = False
+        # Drop results for a buffer that changed in the meantime, the lines
+        # stay unsynced and go out with the next job
+        if (
+            version != self.version
+            or self.resubmit
+            or self.needs_reset
+            or self.text_widget.edit_modified()
+        ):
+            self.resubmit = False
+            self.submit()
+            return
+
+        widget = self.text_widget._w
+        for tag, indices in removes.items():
+            self.text_widget.tk.call(widget, "tag", "remove", tag, *indices)
+        for tag, indices in adds.items():
+            self.text_widget.tk.call(widget, "tag", "add", tag, *indices)
+
+        for first, last, line_tokens in runs:
+            self.painted[first:last] = line_tokens
+            self.synced[first:last] = [True] * (last - first)
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import pickle
+
+import pygments
+
+# Configuration paths
+if os.name == "nt":  # Windows
+    CONFIG_DIR = os.path.join(os.path.expanduser("~"), "pydot")
+else:  # Linux, macOS, etc.
+    CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".config", "pydot")
+
+CACHE_DIR = os.path.join(CONFIG_DIR, "token_cache")
+
+# Bump when the pickled engine state changes shape
+CACHE_VERSION = 1
+
+# Least recently used entries are removed once the cache grows past this
+MAX_CACHE_SIZE = 64 * 1024 * 1024
+
+
+class TokenCache:
+    def __init__(self, directory: str = CACHE_DIR, max_size: int = MAX_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, engine, text: str) -> str:
+        digest = hashlib.sha1()
+        digest.update(
+            repr(
+                (
+                    CACHE_VERSION,
+                    pygments.__version__,
+                    type(engine.lexer).__name__,
+                    engine.fast,
+                    engine.checkpoint_interval,
+                    None if engine.tags is None else sorted(engine.tags),
+                )
+            ).encode()
+        )
+        digest.update(text.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def load(self, engine, text: str) -> bool:
+        path = os.path.join(self.directory, self.key(engine, text) + ".pickle")
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            # Mark as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        except (OSError, pickle.PickleError, EOFError, ValueError, TypeError):
+            return False
+
+        engine.restore(text, state)
+        return True
+
+    def store(self, engine):
+        path = os.path.join(self.directory, self.key(engine, engine.text) + ".pickle")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                pickle.dump(engine.snapshot(), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(path + ".tmp", path)
+            self.evict()
+        except OSError as e:
+            print(f"Error writing token cache: {e}")
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".pickle"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size